@@ -1,6 +1,9 @@
+import time
+_import_started = time.perf_counter()
+
 import os
-import pandas as pd
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 from pydantic import BaseModel, Field
@@ -8,17 +11,46 @@ from typing import List, Optional
 from datetime import datetime
 from dotenv import load_dotenv
 from bson import ObjectId
-import re
-from collections import Counter
+from pymongo import InsertOne, UpdateOne, UpdateMany, ReturnDocument
+from pymongo.errors import BulkWriteError
+import asyncio
+import importlib.util
+import signal
+
+from jobs import JobManager, JOB_CANCELLED
+from ingest import stream_csv_to_collection
+from keywords import search_tokenize, extract_keywords, extract_keywords_batch
+from bootstrap import bootstrap_simple_topics
+from search_index import SearchIndex, SEARCH_FIELDS, fuse_rankings
+from query_cache import QueryResultCache, normalize_query
+from facets import FacetIndex, FACET_FIELDS, FACET_MODES, COMBINE_MODES
+from topic_matcher import TopicMatcher
+from corpus import ShadowCollection, commit_shadows, create_document_indexes, create_topic_indexes, drop_stale_shadows
+from topic_worker import fit_topics_from_csv, merge_topic_model, build_vector_index, get_encoder
+from vector_index import VectorIndex
+from incremental import IncrementalAssigner
+from embedding_cache import EmbeddingStore
+from model_store import ModelStore, DEFAULT_EMBEDDING_MODEL, rank_topics
+from counts import DocumentCounts
+from popularity import PopularityTracker, TRENDING_FIELD
+from pagination import SORTABLE_FIELDS, CursorError, sort_direction, fetch_page, open_page, iter_page
+from projection import ProjectionError, build_projection
+from responses import FastJSONResponse, ndjson_response, wants_ndjson
+from events import ChangeEvents, DOCUMENTS_CREATED, DOCUMENTS_UPDATED, DOCUMENTS_DELETED, TOPICS_CHANGED, CORPUS_RELOADED, VECTORS_BUILT
+from worker_sync import WorkerSync
+from bulk import BulkBodyError, parse_items, validate_items, parse_ids, item_error, write_errors_by_position, summarize
+from cache import ReadCache, MemoryCacheBackend, RedisCacheBackend, TOPICS_TAG, DOCUMENTS_TAG, document_tag
+import metrics
+from metrics import span, record_stages, MongoCommandListener
 
 
-try:
-    from bertopic import BERTopic
-    BERTOPIC_AVAILABLE = True
-except ImportError:
-    BERTOPIC_AVAILABLE = False
+# BERTopic drags in torch, UMAP and HDBSCAN, it is only imported when a model is loaded or fitted
+BERTOPIC_AVAILABLE = importlib.util.find_spec("bertopic") is not None
+if not BERTOPIC_AVAILABLE:
     print("Warning: BERTopic not installed. Topic generation will not be available.")
 
+SENTENCE_TRANSFORMERS_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+
 
 load_dotenv()
 
@@ -26,9 +58,49 @@ load_dotenv()
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017/")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "neurodoc")
 CSV_PATH = os.getenv("CSV_PATH", r"r:\NeuroDoc\1k_stories_100_genre.csv")
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "10000"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "1000"))
+INGEST_MAX_IN_FLIGHT = int(os.getenv("INGEST_MAX_IN_FLIGHT", "4"))
+BOOTSTRAP_BATCH_SIZE = int(os.getenv("BOOTSTRAP_BATCH_SIZE", "2000"))
+BOOTSTRAP_WORKERS = int(os.getenv("BOOTSTRAP_WORKERS", "0")) or None
+MODEL_DIR = os.getenv("MODEL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models"))
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "embeddings"))
+EMBEDDING_CACHE_CAPACITY = int(os.getenv("EMBEDDING_CACHE_CAPACITY", "1000000"))
+INCREMENTAL_BATCH_SIZE = int(os.getenv("INCREMENTAL_BATCH_SIZE", "64"))
+INCREMENTAL_MAX_WAIT_SECONDS = float(os.getenv("INCREMENTAL_MAX_WAIT_SECONDS", "2"))
+MERGE_THRESHOLD = int(os.getenv("MERGE_THRESHOLD", "1000"))
+MERGE_MIN_DOCUMENTS = int(os.getenv("MERGE_MIN_DOCUMENTS", "50"))
+MERGE_MAX_DOCUMENTS = int(os.getenv("MERGE_MAX_DOCUMENTS", "50000"))
+MERGE_MIN_SIMILARITY = float(os.getenv("MERGE_MIN_SIMILARITY", "0.7"))
+ASSIGN_WRITE_CONCURRENCY = int(os.getenv("ASSIGN_WRITE_CONCURRENCY", "64"))
+SNIPPET_LENGTH = int(os.getenv("SNIPPET_LENGTH", "200"))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "")
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "100000"))
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "vectors"))
+VECTOR_NLIST = int(os.getenv("VECTOR_NLIST", "-1"))
+# documents embedded since the last build are brute-forced on every semantic query
+VECTOR_DELTA_REBUILD = int(os.getenv("VECTOR_DELTA_REBUILD", "20000"))
+VECTOR_NPROBE = int(os.getenv("VECTOR_NPROBE", "16"))
+VECTOR_BUILD_BATCH_SIZE = int(os.getenv("VECTOR_BUILD_BATCH_SIZE", "1024"))
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "60"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1000"))
+SEARCH_RANK_DEPTH = int(os.getenv("SEARCH_RANK_DEPTH", "200"))
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+FAST_START = os.getenv("FAST_START", "1") == "1"
+PREWARM_MODELS = os.getenv("PREWARM_MODELS", "1") == "1"
+WORKER_SYNC = os.getenv("WORKER_SYNC", "0") == "1"
+WORKER_SYNC_SECONDS = float(os.getenv("WORKER_SYNC_SECONDS", "1"))
+WORKER_LEASE_SECONDS = float(os.getenv("WORKER_LEASE_SECONDS", str(6 * 3600)))
+TRENDING_SORTS = ("trending", "popularity")
+SEARCH_MODES = ("lexical", "semantic", "hybrid")
 
 
-app = FastAPI(title="NeuroDoc API", version="1.0.0")
+app = FastAPI(title="NeuroDoc API", version="1.0.0", default_response_class=FastJSONResponse)
 
 
 app.add_middleware(
@@ -40,106 +112,472 @@ app.add_middleware(
 )
 
 
+# cleared while shadow collections are renamed into place, topics and documents
+# are two renames and no request should see one without the other
+corpus_swapped = asyncio.Event()
+corpus_swapped.set()
+
+
+@app.middleware("http")
+async def wait_for_corpus_swap(request: Request, call_next):
+    if not corpus_swapped.is_set():
+        await corpus_swapped.wait()
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    trace, token = metrics.start_trace(request.method, request.url.path)
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.end_trace(token)
+        elapsed = time.perf_counter() - trace.started
+        if metrics.FIRST_REQUEST_SECONDS.value is None:
+            metrics.FIRST_REQUEST_SECONDS.set(time.perf_counter() - _import_started)
+        # label by route template so /api/documents/{doc_id} is one series, not one per id
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        metrics.REQUEST_SECONDS.observe(elapsed, method=request.method, route=route)
+        metrics.REQUESTS.inc(method=request.method, route=route, status=status)
+        metrics.REQUEST_DB_ROUND_TRIPS.observe(trace.db_round_trips, method=request.method, route=route)
+        if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+            print(
+                f"Slow request: {request.method} {trace.path} {status} {elapsed * 1000:.1f} ms, "
+                f"{trace.db_round_trips} db round trips [{trace.breakdown()}]"
+            )
+
+
 client = None
 db = None
 
 
 topic_model = None
+topic_model_version = None
+topic_model_attempted = False
+topic_model_lock = asyncio.Lock()
+# set when a gunicorn master loaded the models before forking, see gunicorn.conf.py
+shared_state_preloaded = False
+worker_reload_requested = False
 
+# required checks gate /health/ready, the others are reported for information
+readiness = {"database": False, "indexes": False, "topics": False}
+startup_error = None
 
-def extract_keywords(text, num_keywords=5):
-    text = re.sub(r'[^a-zA-Z\s]', '', text.lower())
+model_store = ModelStore(MODEL_DIR, EMBEDDING_MODEL)
 
-    stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 
-                  'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were', 'be', 
-                  'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 
-                  'should', 'could', 'may', 'might', 'can', 'this', 'that', 'these', 
-                  'those', 'it', 'its', 'they', 'them', 'their', 'he', 'she', 'him', 
-                  'her', 'his', 'i', 'you', 'we', 'us', 'my', 'your', 'our'}
-    
-    
-    words = [word for word in text.split() if word not in stop_words and len(word) > 3]
-    word_freq = Counter(words)
-        
-    return [word for word, _ in word_freq.most_common(num_keywords)]
+embedding_cache = EmbeddingStore(EMBEDDING_CACHE_DIR, EMBEDDING_MODEL, capacity=EMBEDDING_CACHE_CAPACITY)
+vector_index = VectorIndex(VECTOR_INDEX_DIR, nprobe=VECTOR_NPROBE)
 
-def find_or_create_topic(keywords, existing_topics):
-    for topic in existing_topics:
-        topic_keywords = set(topic.get('keywords', []))
-        if any(kw in topic_keywords for kw in keywords):
-            return topic['topic_id'], topic['keywords'][:3]
-    
-    return None, keywords[:3]
+incremental_assigner = IncrementalAssigner(INCREMENTAL_BATCH_SIZE, INCREMENTAL_MAX_WAIT_SECONDS)
+pending_merge_count = 0
+
+job_manager = JobManager(max_workers=1)
+
+topic_matcher = TopicMatcher(max_age_seconds=int(os.getenv("TOPIC_REFRESH_SECONDS", "60")))
+
+search_index = SearchIndex(search_tokenize)
+facet_index = FacetIndex()
+change_events = ChangeEvents()
+read_cache = ReadCache(
+    RedisCacheBackend(CACHE_REDIS_URL) if CACHE_REDIS_URL
+    else MemoryCacheBackend(max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES),
+    ttl_seconds=CACHE_TTL_SECONDS
+)
+change_events.subscribe(read_cache.on_change)
+query_cache = QueryResultCache(max_entries=SEARCH_CACHE_MAX_ENTRIES, ttl_seconds=SEARCH_CACHE_TTL_SECONDS)
+change_events.subscribe(query_cache.on_change)
+document_counts = DocumentCounts(
+    flush_interval_seconds=float(os.getenv("COUNTS_FLUSH_SECONDS", "5"))
+)
+popularity_tracker = PopularityTracker(
+    flush_interval_seconds=float(os.getenv("POPULARITY_FLUSH_SECONDS", "10")),
+    half_life_hours=float(os.getenv("TRENDING_HALF_LIFE_HOURS", "24"))
+)
+
+
+async def resolve_topic_names(topic_id_lists):
+    # served from the matcher's topic map, one $in query covers topics it hasn't seen yet
+    await topic_matcher.ensure_fresh(db.topics)
+    wanted = {topic_id for topic_ids in topic_id_lists for topic_id in topic_ids}
+    keywords = {topic_id: topic_matcher.keywords_for(topic_id) for topic_id in wanted if topic_id in topic_matcher.topics}
+    missing = wanted - keywords.keys()
+    if missing:
+        async for topic in db.topics.find({"topic_id": {"$in": list(missing)}}, {"topic_id": 1, "keywords": 1}):
+            keywords[topic["topic_id"]] = topic.get("keywords", [])
 
-async def generate_simple_topics_if_needed():
+    return [
+        [name for topic_id in topic_ids for name in keywords.get(topic_id, [])[:3]]
+        for topic_ids in topic_id_lists
+    ]
+
+async def run_topic_bootstrap(job):
+    topics = await bootstrap_simple_topics(
+        db,
+        batch_size=BOOTSTRAP_BATCH_SIZE,
+        workers=BOOTSTRAP_WORKERS,
+        progress=job.set_stage,
+    )
+    if topics:
+        job.set_stage("indexing", 0.98)
+        await topic_matcher.refresh(db.topics)
+        await search_index.rebuild(db.documents)
+        await facet_index.rebuild(db.documents)
+        await document_counts.rebuild(db.documents)
+        await document_counts.flush(db.topics)
+        await change_events.emit(TOPICS_CHANGED)
+    return {"topics_count": len(topics)}
+
+async def load_topic_model(version=None):
+    global topic_model, topic_model_version
+
+    if not BERTOPIC_AVAILABLE:
+        return None
     try:
-        topic_count = await db.topics.count_documents({})
-        if topic_count > 0:
-            print(f"Topics already exist: {topic_count} topics")
-            return
-        
-        print("Generating simple keyword-based topics from documents...")
-        documents = await db.documents.find().to_list(length=None)
-        
-        if not documents:
-            print("No documents found to generate topics from")
-            return
-        
-        
-        all_keywords = []
-        for doc in documents:
-            content = doc.get('content', '') + ' ' + doc.get('title', '')
-            keywords = extract_keywords(content, num_keywords=10)
-            all_keywords.extend(keywords)
-        
-        
-        keyword_freq = Counter(all_keywords)
-        top_keywords = keyword_freq.most_common(50)
-        
-        
-        topics_to_insert = []
-        topic_id = 0
-        
-        for keyword, freq in top_keywords[:30]:  
-            topic_doc = {
-                "topic_id": topic_id,
-                "name": keyword.capitalize(),
-                "keywords": [keyword],
-                "count": freq,
-                "representative_docs": []
-            }
-            topics_to_insert.append(topic_doc)
-            topic_id += 1
-        
-        if topics_to_insert:
-            await db.topics.insert_many(topics_to_insert)
-            print(f"Generated {len(topics_to_insert)} simple topics")
-        
-        
-        for doc in documents:
-            content = doc.get('content', '') + ' ' + doc.get('title', '')
-            doc_keywords = set(extract_keywords(content, num_keywords=10))
-            
-            
-            matching_topics = []
-            for topic in topics_to_insert:
-                if any(kw in doc_keywords for kw in topic['keywords']):
-                    matching_topics.append(topic['topic_id'])
-            
-            if matching_topics:
-                topic_names = [topics_to_insert[tid]['keywords'][0] for tid in matching_topics[:3]]
-                await db.documents.update_one(
-                    {"_id": doc["_id"]},
-                    {"$set": {
-                        "topics": matching_topics[:3],
-                        "topic_names": topic_names
-                    }}
-                )
-        
-        print("Updated documents with topic assignments")
-        
+        model, loaded_version = await asyncio.to_thread(model_store.load, version)
     except Exception as e:
-        print(f"Error generating simple topics: {str(e)}")
+        print(f"Error loading topic model: {str(e)}")
+        return None
+    if model is not None:
+        topic_model, topic_model_version = model, loaded_version
+        print(f"Loaded topic model version {loaded_version}")
+    return model
+
+async def ensure_topic_model():
+    # loaded on first use unless PREWARM_MODELS already did it at startup
+    global topic_model_attempted
+    if topic_model is None and not topic_model_attempted:
+        async with topic_model_lock:
+            if not topic_model_attempted:
+                await load_topic_model()
+                topic_model_attempted = True
+    return topic_model
+
+async def prewarm_models():
+    if vector_index.version is None:
+        await load_vector_index()
+    model = await ensure_topic_model()
+    if model is None and SENTENCE_TRANSFORMERS_AVAILABLE and vector_index.ready:
+        # semantic search needs an encoder even without a topic model
+        await asyncio.to_thread(get_encoder, EMBEDDING_MODEL)
+    print(f"Models warmed up {time.perf_counter() - _import_started:.2f}s after import")
+
+async def load_vector_index(version=None):
+    try:
+        meta = await asyncio.to_thread(vector_index.load, version)
+    except Exception as e:
+        print(f"Error loading vector index: {str(e)}")
+        return None
+    if meta:
+        print(f"Loaded vector index {meta['version']}: {meta['count']} documents")
+    return meta
+
+async def run_vector_build(job):
+    job.set_stage("embedding", 0.1)
+    built = await job_manager.run_in_process(
+        build_vector_index,
+        MONGODB_URL,
+        DATABASE_NAME,
+        VECTOR_INDEX_DIR,
+        EMBEDDING_MODEL,
+        EMBEDDING_CACHE_DIR,
+        EMBEDDING_CACHE_CAPACITY,
+        VECTOR_BUILD_BATCH_SIZE,
+        None if VECTOR_NLIST < 0 else VECTOR_NLIST
+    )
+    record_stages("vector_build", built.get("timings"))
+    job.set_stage("loading", 0.95)
+    if built["version"]:
+        await load_vector_index(built["version"])
+        await change_events.emit(VECTORS_BUILT)
+        request_worker_reload()
+    return built
+
+def submit_vector_build():
+    if not SENTENCE_TRANSFORMERS_AVAILABLE:
+        return None
+    return job_manager.active("build_vectors") or job_manager.submit("build_vectors", exclusive(run_vector_build))
+
+async def embed_queries(texts):
+    # the loaded topic model already holds the encoder, otherwise load one here
+    model = topic_model
+    if model is not None:
+        encode = model.embedding_model.embed
+    else:
+        encode = lambda batch: get_encoder(EMBEDDING_MODEL).encode(batch)
+    return await asyncio.to_thread(embedding_cache.embed, texts, encode)
+
+async def on_vector_change(event, doc_ids, topic_ids):
+    if event == DOCUMENTS_DELETED:
+        for doc_id in doc_ids:
+            vector_index.remove(doc_id)
+    elif event == CORPUS_RELOADED:
+        # every document id changed, the old index can't be patched
+        submit_vector_build()
+
+change_events.subscribe(on_vector_change)
+
+worker_sync = WorkerSync(poll_interval_seconds=WORKER_SYNC_SECONDS)
+change_events.subscribe(worker_sync.publish)
+
+def preload_shared_state():
+    # called in the gunicorn master before it forks, workers share the loaded
+    # weights copy-on-write instead of each loading its own copy
+    global topic_model, topic_model_version, topic_model_attempted, shared_state_preloaded
+    started = time.perf_counter()
+    if BERTOPIC_AVAILABLE:
+        try:
+            model, version = model_store.load()
+            if model is not None:
+                topic_model, topic_model_version = model, version
+        except Exception as e:
+            print(f"Error preloading topic model: {str(e)}")
+        topic_model_attempted = True
+    try:
+        vector_index.load()
+    except Exception as e:
+        print(f"Error preloading vector index: {str(e)}")
+    if topic_model is None and SENTENCE_TRANSFORMERS_AVAILABLE and vector_index.ready:
+        get_encoder(EMBEDDING_MODEL)
+    shared_state_preloaded = True
+    print(
+        f"Preloaded topic model {topic_model_version} and vector index {vector_index.version} "
+        f"in {time.perf_counter() - started:.2f}s (pid {os.getpid()})"
+    )
+
+def exclusive(runner, busy_result=None, lease=None):
+    # with several workers only one runs a given job, the others skip or fail it
+    async def run(job):
+        async with worker_sync.lease(lease or job.kind, WORKER_LEASE_SECONDS) as acquired:
+            if not acquired:
+                if busy_result is not None:
+                    return busy_result
+                raise RuntimeError(f"{job.kind} is already running on another worker")
+            return await runner(job)
+    return run
+
+def request_worker_reload():
+    global worker_reload_requested
+    if shared_state_preloaded and not worker_reload_requested:
+        worker_reload_requested = True
+        asyncio.create_task(reload_workers_when_idle())
+
+async def reload_workers_when_idle():
+    # HUP makes the master reload the models and fork fresh workers that share them;
+    # this worker is replaced too, so jobs it is still running (like the vector build
+    # a corpus reload queues) finish first
+    while any(not job.finished for job in job_manager.jobs.values()):
+        await asyncio.sleep(1)
+    print(f"Asking the gunicorn master (pid {os.getppid()}) to reload workers")
+    os.kill(os.getppid(), signal.SIGHUP)
+
+async def reload_latest_models():
+    latest = model_store.latest_version()
+    # preloaded workers are about to be replaced by forks sharing the new model
+    if not shared_state_preloaded and topic_model_attempted and latest and latest != topic_model_version:
+        await load_topic_model(latest)
+    # vectors are memory-mapped, every worker maps the same pages whoever loads them
+    if vector_index.latest_version() not in (None, vector_index.version):
+        await load_vector_index()
+
+async def apply_worker_event(event, doc_ids, topic_ids):
+    if event in (DOCUMENTS_CREATED, DOCUMENTS_UPDATED):
+        found = await fetch_by_ids(doc_ids, {field: 1 for field in {*SEARCH_FIELDS, *FACET_FIELDS}})
+        for doc_id in doc_ids:
+            doc = found.get(doc_id)
+            if doc is None:
+                # deleted since, the delete event follows
+                continue
+            # the facet index still holds this worker's view of the document's topics
+            old_topics = facet_index.document_values(doc_id, "topics")
+            if old_topics is None:
+                document_counts.document_added(doc.get("topics"))
+            else:
+                document_counts.topics_changed(old_topics, doc.get("topics"))
+            search_index.add(doc_id, doc)
+            facet_index.add(doc_id, doc)
+    elif event == DOCUMENTS_DELETED:
+        for doc_id in doc_ids:
+            old_topics = facet_index.document_values(doc_id, "topics")
+            if old_topics is not None:
+                document_counts.document_removed(old_topics)
+            search_index.remove(doc_id)
+            facet_index.remove(doc_id)
+            vector_index.remove(doc_id)
+    elif event in (TOPICS_CHANGED, CORPUS_RELOADED):
+        if event == CORPUS_RELOADED:
+            # every id changed, until rebuilt search falls back to $text and facets to 503
+            search_index.ready = facet_index.ready = document_counts.ready = False
+        # merges and reloads rewrite topics across the corpus without per-document events
+        await topic_matcher.refresh(db.topics)
+        await search_index.rebuild(db.documents)
+        await facet_index.rebuild(db.documents)
+        await document_counts.rebuild(db.documents)
+        await reload_latest_models()
+    elif event == VECTORS_BUILT:
+        await reload_latest_models()
+
+    await read_cache.on_change(event, doc_ids, topic_ids)
+    await query_cache.on_change(event, doc_ids, topic_ids)
+
+def semantic_search_available():
+    return vector_index.ready and (topic_model is not None or SENTENCE_TRANSFORMERS_AVAILABLE)
+
+async def rank_query(q, mode, depth):
+    # rankings are cached to a fixed depth so every page of a query is served from one entry
+    key = f"{mode}:{normalize_query(q)}"
+    cached = query_cache.get(key, depth)
+    if cached is not None:
+        return cached
+
+    generation = query_cache.generation
+    if mode == "lexical":
+        with span("search.lexical"):
+            total, ranked = search_index.search(q, 0, depth)
+    else:
+        with span("embed_query"):
+            query_vector = (await embed_queries([normalize_query(q)]))[0]
+        with span("search.semantic"):
+            semantic = vector_index.search(query_vector, depth)
+        if mode == "semantic":
+            total, ranked = len(semantic), semantic
+        else:
+            with span("search.lexical"):
+                _, lexical = search_index.search(q, 0, depth)
+            fused = fuse_rankings([lexical, semantic], HYBRID_RRF_K)
+            total, ranked = len(fused), fused[:depth]
+    query_cache.set(key, depth, (total, ranked), generation)
+    return total, ranked
+
+def topic_words(model, topic_id, count=3):
+    if topic_id == -1:
+        return []
+    topic_keywords = model.get_topic(topic_id)
+    return [word for word, score in topic_keywords[:count]] if topic_keywords else []
+
+async def apply_topic_assignments(assignments, unset_pending):
+    # assignments are (snapshot, topics, topic_names); a write only lands while the document
+    # is still pending and its topics are what the snapshot saw, so a document deleted or
+    # edited since keeps what the user gave it
+    projection = {field: 1 for field in {*SEARCH_FIELDS, *FACET_FIELDS}}
+
+    async def assign(doc, topics, topic_names):
+        update = {"$set": {"topics": topics, "topic_names": topic_names}}
+        if unset_pending:
+            update["$unset"] = {"pending_merge": ""}
+        return await db.documents.find_one_and_update(
+            {"_id": ObjectId(doc["_id"]), "pending_merge": True, "topics": doc.get("topics")},
+            update,
+            projection=projection,
+            return_document=ReturnDocument.AFTER
+        )
+
+    applied = []
+    changed_topics = set()
+    for start in range(0, len(assignments), ASSIGN_WRITE_CONCURRENCY):
+        chunk = assignments[start:start + ASSIGN_WRITE_CONCURRENCY]
+        stored_docs = await asyncio.gather(*(assign(*assignment) for assignment in chunk))
+        for (doc, topics, _), stored in zip(chunk, stored_docs):
+            if stored is None:
+                continue
+            # indexes take the stored post-image, not the snapshot the batch started from
+            doc_id = str(stored["_id"])
+            changed_topics |= document_counts.topics_changed(doc.get("topics"), topics)
+            search_index.add(doc_id, stored)
+            facet_index.add(doc_id, stored)
+            applied.append(doc_id)
+    return applied, changed_topics
+
+async def assign_new_documents(batch):
+    global pending_merge_count
+
+    pending_merge_count += len(batch)
+    model = await ensure_topic_model()
+    if model is None:
+        return
+
+    texts = [doc.get("content") or "" for doc in batch]
+    with span("assign.embed"):
+        embeddings = await asyncio.to_thread(embedding_cache.embed, texts, model.embedding_model.embed)
+    with span("assign.transform"):
+        topics, _ = await asyncio.to_thread(model.transform, texts, embeddings)
+
+    assignments = []
+    for doc, topic_id in zip(batch, topics):
+        topic_id = int(topic_id)
+        assignments.append((doc, [topic_id] if topic_id != -1 else [], topic_words(model, topic_id)))
+    applied, changed_topics = await apply_topic_assignments(assignments, unset_pending=False)
+    if applied:
+        rows = {doc["_id"]: i for i, doc in enumerate(batch)}
+        unindexed = vector_index.unindexed
+        vector_index.add(applied, embeddings[[rows[doc_id] for doc_id in applied]])
+        # once per threshold crossed, so a failing build isn't retried every batch
+        if VECTOR_DELTA_REBUILD and unindexed // VECTOR_DELTA_REBUILD < vector_index.unindexed // VECTOR_DELTA_REBUILD:
+            submit_vector_build()
+        await change_events.emit(DOCUMENTS_UPDATED, applied, changed_topics)
+
+    if (
+        pending_merge_count >= MERGE_THRESHOLD
+        and not job_manager.active("merge_topics")
+        and not job_manager.active("generate_topics")
+    ):
+        job_manager.submit("merge_topics", exclusive(
+            run_topic_merge, {"message": "Merge already running on another worker", "documents_merged": 0}, lease="topic_model"
+        ))
+
+async def run_topic_merge(job):
+    global pending_merge_count
+
+    documents = await db.documents.find(
+        {"pending_merge": True},
+        {"title": 1, "content": 1, "genre": 1, "topics": 1}
+    ).to_list(length=MERGE_MAX_DOCUMENTS)
+    if len(documents) < MERGE_MIN_DOCUMENTS:
+        return {"message": "Not enough new documents to merge", "documents_merged": 0}
+
+    job.set_stage("fitting", 0.1)
+    merged = await job_manager.run_in_process(
+        merge_topic_model,
+        MODEL_DIR,
+        EMBEDDING_MODEL,
+        topic_model_version,
+        [doc.get("content") or "" for doc in documents],
+        MERGE_MIN_SIMILARITY,
+        EMBEDDING_CACHE_DIR,
+        EMBEDDING_CACHE_CAPACITY
+    )
+    record_stages("merge", merged.get("timings"))
+
+    job.cancellable = False
+    job.set_stage("writing_topics", 0.8)
+    await db.topics.bulk_write([
+        UpdateOne({"topic_id": topic["topic_id"]}, {"$setOnInsert": topic}, upsert=True)
+        for topic in merged["topic_docs"]
+    ], ordered=False)
+    # only now does LATEST point at the merged model, its new topics are in Mongo
+    if merged["model_version"]:
+        model_store.publish(merged["model_version"])
+
+    job.set_stage("writing_documents", 0.9)
+    await apply_topic_assignments([
+        (doc, [topic_id] if topic_id != -1 else [], merged["topic_names"].get(topic_id, []))
+        for doc, topic_id in zip(documents, merged["topics"])
+    ], unset_pending=True)
+
+    pending_merge_count = max(0, pending_merge_count - len(documents))
+    await topic_matcher.refresh(db.topics)
+    await load_topic_model(merged["model_version"])
+    await change_events.emit(TOPICS_CHANGED)
+    request_worker_reload()
+
+    return {
+        "message": "New documents merged into the topic model",
+        "documents_merged": len(documents),
+        "topics_count": len(merged["topic_docs"]),
+        "model_version": merged["model_version"]
+    }
 
 
 class PyObjectId(ObjectId):
@@ -207,11 +645,49 @@ class DocumentUpdateModel(BaseModel):
     year: Optional[int] = None
     doi: Optional[str] = None
 
+class TopicAssignmentModel(BaseModel):
+    ids: List[str]
+    topics: List[int]
+
+class TopicReassignmentRequest(BaseModel):
+    assignments: List[TopicAssignmentModel]
+
+class SemanticSearchRequest(BaseModel):
+    query: str = Field(..., min_length=1)
+    k: int = Field(10, ge=1, le=1000)
+    fields: Optional[str] = None
+
+class FacetQueryRequest(BaseModel):
+    genre: List[str] = []
+    topics: List[int] = []
+    year: List[int] = []
+    year_from: Optional[int] = None
+    year_to: Optional[int] = None
+    topics_mode: str = "any"
+    combine: str = "and"
+    facets: Optional[List[str]] = None
+    skip: int = Field(0, ge=0)
+    limit: int = Field(50, ge=0, le=1000)
+    include_documents: bool = False
+    fields: Optional[str] = None
+
 class TopicGenerationResponse(BaseModel):
     message: str
     topics_count: int
     documents_processed: int
 
+class JobResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    stage: str
+    progress: float
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
 class TopicSuggestionRequest(BaseModel):
     content: str
     num_topics: int = 5
@@ -221,30 +697,125 @@ class TopicSuggestionResponse(BaseModel):
     suggested_topic_ids: List[int]
 
 
+async def prepare_database(started_at):
+    global pending_merge_count, startup_error
+    delay = 1
+    prepared = False
+    while True:
+        try:
+            await client.admin.command("ping")
+            readiness["database"] = True
+
+            if not prepared:
+                await drop_stale_shadows(db)
+                await create_document_indexes(db.documents)
+                await create_topic_indexes(db.topics)
+                readiness["indexes"] = True
+                print("Database indexes created")
+
+                await topic_matcher.refresh(db.topics)
+                readiness["topics"] = True
+                if WORKER_SYNC:
+                    await worker_sync.start(db, apply_worker_event)
+                job_manager.active("bootstrap_topics") or job_manager.submit(
+                    "bootstrap_topics", exclusive(run_topic_bootstrap, {"topics_count": 0})
+                )
+
+                # documents created since startup are counted by assign_new_documents
+                pending_merge_count += await db.documents.count_documents(
+                    {"pending_merge": True, "_id": {"$lt": ObjectId.from_datetime(started_at)}}
+                )
+                startup_error = None
+                metrics.READY_SECONDS.set(time.perf_counter() - _import_started)
+                print(f"Ready {metrics.READY_SECONDS.value:.2f}s after import")
+                prepared = True
+
+            # built only once Mongo answers and retried with the rest, search and totals
+            # fall back to Mongo until they are ready so readiness doesn't wait on them
+            results = await asyncio.gather(*(
+                index.rebuild(db.documents)
+                for index in (search_index, facet_index, document_counts) if not index.ready
+            ), return_exceptions=True)
+            errors = [result for result in results if isinstance(result, Exception)]
+            if errors:
+                raise errors[0]
+            startup_error = None
+            return
+        except Exception as e:
+            startup_error = str(e)
+            if not FAST_START:
+                raise
+            # the process stays live and keeps retrying, readiness stays false until it succeeds
+            print(f"Error preparing database, retrying in {delay}s: {startup_error}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
 @app.on_event("startup")
 async def startup_db_client():
     global client, db
-    client = AsyncIOMotorClient(MONGODB_URL)
+    started = time.perf_counter()
+    client = AsyncIOMotorClient(MONGODB_URL, event_listeners=[MongoCommandListener()])
     db = client[DATABASE_NAME]
     print(f"Connected to MongoDB: {DATABASE_NAME}")
-    
-    
-    await db.documents.create_index([("title", "text"), ("content", "text")])
-    await db.documents.create_index("topics")
-    await db.documents.create_index("topic_names")
-    print("Database indexes created")
-    
-    
-    await generate_simple_topics_if_needed()
+
+    # nothing here waits on Mongo or the ML stack, /health/ready reports when they are done
+    preparing = asyncio.create_task(prepare_database(datetime.utcnow()))
+    document_counts.start(db.topics)
+    popularity_tracker.start(db.documents)
+    incremental_assigner.start(assign_new_documents)
+    if PREWARM_MODELS:
+        asyncio.create_task(prewarm_models())
+    else:
+        asyncio.create_task(load_vector_index())
+
+    if not FAST_START:
+        await preparing
+    metrics.STARTUP_SECONDS.set(time.perf_counter() - started)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
     global client
+    await worker_sync.stop()
+    await incremental_assigner.stop()
+    await document_counts.stop(db.topics)
+    await popularity_tracker.stop(db.documents)
+    job_manager.shutdown()
     if client:
         client.close()
         print("Disconnected from MongoDB")
 
 
+def resolve_sort(sort_by, order):
+    if sort_by not in SORTABLE_FIELDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"sort_by must be one of: {', '.join(SORTABLE_FIELDS)}"
+        )
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+    return sort_by, sort_direction(order)
+
+async def fetch_by_ids(doc_ids, projection=None):
+    # one $in fetch, keyed by id so callers can put the documents back in their own order
+    if not doc_ids:
+        return {}
+    found = await db.documents.find(
+        {"_id": {"$in": [ObjectId(doc_id) for doc_id in doc_ids]}},
+        projection
+    ).to_list(length=len(doc_ids))
+    return {str(doc["_id"]): doc for doc in found}
+
+async def hydrate_ranked(ranked, projection=None):
+    # a ranked page of (doc_id, score), returned in rank order
+    by_id = await fetch_by_ids([doc_id for doc_id, _ in ranked], projection)
+    documents = []
+    for doc_id, score in ranked:
+        doc = by_id.get(doc_id)
+        if doc:
+            doc["score"] = score
+            documents.append(doc)
+    return documents
+
 def serialize_doc(doc):
     if doc and "_id" in doc:
         doc["_id"] = str(doc["_id"])
@@ -260,186 +831,612 @@ async def read_root():
             "topics": "/api/topics",
             "documents": "/api/documents",
             "search": "/api/documents/search",
-            "generate_topics": "/api/topics/generate"
+            "facets": "/api/documents/facets",
+            "generate_topics": "/api/topics/generate",
+            "jobs": "/api/jobs"
         }
     }
 
-@app.post("/api/topics/generate", response_model=TopicGenerationResponse)
+async def commit_corpus(shadow_documents, *shadows):
+    # the in-memory indexes are built from the shadow before the renames and installed
+    # inside the same gate, so no request pairs the new corpus with the old ids
+    fresh_search, fresh_facets, counted = await asyncio.gather(
+        search_index.build(shadow_documents.collection),
+        facet_index.build(shadow_documents.collection),
+        document_counts.build(shadow_documents.collection),
+    )
+
+    async def swapped():
+        search_index.install(fresh_search)
+        facet_index.install(fresh_facets)
+        document_counts.install(counted)
+        await topic_matcher.refresh(db.topics)
+        # cached pages and rankings hold ids of the corpus just dropped
+        await read_cache.on_change(CORPUS_RELOADED, [], set())
+        await query_cache.on_change(CORPUS_RELOADED, [], set())
+
+    await commit_shadows(corpus_swapped, *shadows, shadow_documents, swapped=swapped)
+
+async def run_topic_generation(job):
+    global pending_merge_count
+
+    job.set_stage("fitting", 0.1)
+    fit = await job_manager.run_in_process(
+        fit_topics_from_csv,
+        CSV_PATH,
+        INGEST_CHUNK_SIZE,
+        MODEL_DIR,
+        EMBEDDING_MODEL,
+        EMBEDDING_CACHE_DIR,
+        EMBEDDING_CACHE_CAPACITY
+    )
+    record_stages("fit", fit.get("timings"))
+
+    job.cancellable = False
+    job.set_stage("writing_topics", 0.8)
+    topics_to_insert = fit["topic_docs"]
+    shadow_topics = ShadowCollection(db, "topics", create_topic_indexes)
+    shadow_documents = ShadowCollection(db, "documents", create_document_indexes)
+
+    try:
+        if topics_to_insert:
+            await shadow_topics.collection.insert_many(topics_to_insert)
+
+        job.set_stage("writing_documents", 0.85)
+        stats = await stream_csv_to_collection(
+            shadow_documents.collection,
+            CSV_PATH,
+            chunk_size=INGEST_CHUNK_SIZE,
+            batch_size=INGEST_BATCH_SIZE,
+            max_in_flight=INGEST_MAX_IN_FLIGHT,
+            topics=fit["topics"],
+            topic_names=fit["topic_names"],
+        )
+
+        job.set_stage("indexing", 0.9)
+        await commit_corpus(shadow_documents, shadow_topics)
+    except Exception:
+        await shadow_topics.discard()
+        await shadow_documents.discard()
+        raise
+    if fit["model_version"]:
+        model_store.publish(fit["model_version"])
+
+    job.set_stage("loading_model", 0.99)
+    await load_topic_model(fit["model_version"])
+    pending_merge_count = 0
+    await change_events.emit(CORPUS_RELOADED)
+    request_worker_reload()
+
+    return TopicGenerationResponse(
+        message="Topics generated successfully",
+        topics_count=len(topics_to_insert),
+        documents_processed=stats.rows
+    ).dict()
+
+@app.post("/api/topics/generate", response_model=JobResponse, status_code=202)
 async def generate_topics():
-    global topic_model
-    
     if not BERTOPIC_AVAILABLE:
         raise HTTPException(
             status_code=503,
             detail="BERTopic is not installed. Please install it with: pip install bertopic"
         )
-    
-    try:
-        
-        if not os.path.exists(CSV_PATH):
-            raise HTTPException(status_code=404, detail=f"CSV file not found: {CSV_PATH}")
-        
-        docs_df = pd.read_csv(CSV_PATH)
-        
-        
-        topic_model = BERTopic(verbose=True, calculate_probabilities=True)
-        
-        
-        topics, probs = topic_model.fit_transform(docs_df['story'])
-        
-        
-        topic_info = topic_model.get_topic_info()
-        
-        
-        await db.topics.delete_many({})
-        
-        
-        topics_to_insert = []
-        for idx, row in topic_info.iterrows():
-            if row['Topic'] == -1:  
-                continue
-            
-            topic_keywords = topic_model.get_topic(row['Topic'])
-            keywords = [word for word, score in topic_keywords[:10]] if topic_keywords else []
-            
-            topic_doc = {
-                "topic_id": int(row['Topic']),
-                "name": row['Name'] if 'Name' in row else f"Topic {row['Topic']}",
-                "keywords": keywords,
-                "count": int(row['Count']),
-                "representative_docs": []
-            }
-            topics_to_insert.append(topic_doc)
-        
-        if topics_to_insert:
-            await db.topics.insert_many(topics_to_insert)
-        
-        
-        await db.documents.delete_many({})
-        
-        
-        documents_to_insert = []
-        for idx, row in docs_df.iterrows():
-            topic_id = int(topics[idx])
-            topic_names = []
-            
-            if topic_id != -1:
-                topic_keywords = topic_model.get_topic(topic_id)
-                topic_names = [word for word, score in topic_keywords[:3]] if topic_keywords else []
-            
-            doc = {
-                "story_id": int(row['id']),
-                "title": row['title'],
-                "content": row['story'],
-                "genre": row['genre'],
-                "topics": [topic_id] if topic_id != -1 else [],
-                "topic_names": topic_names,
-                "authors": [],
-                "year": None,
-                "doi": None,
-                "date_added": datetime.utcnow(),
-                "popularity": 0
-            }
-            documents_to_insert.append(doc)
-        
-        if documents_to_insert:
-            await db.documents.insert_many(documents_to_insert)
-        
-        return TopicGenerationResponse(
-            message="Topics generated successfully",
-            topics_count=len(topics_to_insert),
-            documents_processed=len(documents_to_insert)
+
+    if not os.path.exists(CSV_PATH):
+        raise HTTPException(status_code=404, detail=f"CSV file not found: {CSV_PATH}")
+
+    active_job = job_manager.active("generate_topics")
+    if active_job:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Topic generation already in progress: job {active_job.job_id}"
         )
-    
+
+    try:
+        job = job_manager.submit("generate_topics", exclusive(run_topic_generation, lease="topic_model"))
+        return job.to_dict()
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generating topics: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error starting topic generation: {str(e)}")
+
+@app.post("/api/topics/merge", response_model=JobResponse, status_code=202)
+async def merge_topics():
+    if await ensure_topic_model() is None:
+        raise HTTPException(status_code=409, detail="No topic model loaded, run /api/topics/generate first")
+
+    active_job = job_manager.active("merge_topics") or job_manager.active("generate_topics")
+    if active_job:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Topic model update already in progress: job {active_job.job_id}"
+        )
+
+    job = job_manager.submit("merge_topics", exclusive(run_topic_merge, lease="topic_model"))
+    return job.to_dict()
+
+@app.get("/api/jobs")
+async def get_jobs():
+    return [job.to_dict() for job in job_manager.list()]
+
+@app.get("/api/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.post("/api/jobs/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(job_id: str):
+    job = await job_manager.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.finished and job.status != JOB_CANCELLED:
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    if not job.cancellable:
+        raise HTTPException(status_code=409, detail="Job is writing results and can no longer be cancelled")
+    return job.to_dict()
 
 @app.get("/api/topics")
-async def get_topics(skip: int = 0, limit: int = 100):
-    try:
+async def get_topics(request: Request, skip: int = 0, limit: int = 100):
+    async def load():
         topics = await db.topics.find().skip(skip).limit(limit).to_list(length=limit)
-        return [serialize_doc(topic) for topic in topics]
+        return [document_counts.fill_topic_count(topic) for topic in topics]
+
+    try:
+        return await read_cache.response(request, f"topics:{skip}:{limit}", (TOPICS_TAG,), load)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching topics: {str(e)}")
 
+@app.get("/api/topics/model")
+async def get_topic_model_status():
+    return {
+        "loaded": topic_model is not None,
+        "version": topic_model_version,
+        "latest_version": model_store.latest_version(),
+        "embedding_model": EMBEDDING_MODEL,
+        "embedding_cache": embedding_cache.stats()
+    }
+
+@app.get("/health/live")
+async def health_live():
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def health_ready():
+    ready = all(readiness.values())
+    body = {
+        "status": "ready" if ready else "starting",
+        "checks": {
+            **readiness,
+            "search_index": search_index.ready,
+            "facet_index": facet_index.ready,
+            "document_counts": document_counts.ready,
+            "topic_model": topic_model is not None,
+            "vector_index": vector_index.ready,
+        },
+        "error": startup_error,
+        "import_seconds": metrics.IMPORT_SECONDS.value,
+        "ready_seconds": metrics.READY_SECONDS.value,
+    }
+    return FastJSONResponse(body, status_code=200 if ready else 503)
+
+@app.get("/metrics")
+async def get_metrics():
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    return {**read_cache.stats(), "search": query_cache.stats()}
+
 @app.get("/api/topics/{topic_id}")
-async def get_topic(topic_id: int):
-    try:
+async def get_topic(request: Request, topic_id: int):
+    async def load():
         topic = await db.topics.find_one({"topic_id": topic_id})
         if not topic:
             raise HTTPException(status_code=404, detail="Topic not found")
-        return serialize_doc(topic)
+        return document_counts.fill_topic_count(topic)
+
+    try:
+        return await read_cache.response(request, f"topic:{topic_id}", (TOPICS_TAG,), load)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching topic: {str(e)}")
 
+def prepare_new_document(document, keywords):
+    doc_dict = document.dict()
+    doc_dict["date_added"] = datetime.utcnow()
+    doc_dict["popularity"] = 0
+    doc_dict["story_id"] = 0  
+    
+    
+    with span("topic_match"):
+        doc_dict["topics"] = topic_matcher.match(keywords, limit=3)
+    doc_dict["topic_names"] = keywords[:5]  
+    doc_dict["pending_merge"] = True
+    return doc_dict
+
+def document_created(doc_dict):
+    search_index.add(doc_dict["_id"], doc_dict)
+    facet_index.add(doc_dict["_id"], doc_dict)
+    incremental_assigner.submit(dict(doc_dict))
+    return document_counts.document_added(doc_dict["topics"])
+
+async def index_documents(docs):
+    # bulk endpoints: one batched pass per index rather than a blocking add per document;
+    # facets go first, before anything awaits and a newer write can slip in
+    facet_index.add_many(docs)
+    await search_index.add_many(docs)
+
 @app.post("/api/documents", response_model=dict)
 async def create_document(document: DocumentCreateModel):
     try:
-        doc_dict = document.dict()
-        doc_dict["date_added"] = datetime.utcnow()
-        doc_dict["popularity"] = 0
-        doc_dict["story_id"] = 0  
-        
-        
-        content_text = doc_dict["content"] + " " + doc_dict["title"]
-        keywords = extract_keywords(content_text, num_keywords=10)
-        
-        
-        existing_topics = await db.topics.find().to_list(length=None)
+        content_text = document.content + " " + document.title
+        with span("extract_keywords"):
+            keywords = extract_keywords(content_text, num_keywords=10)
         
         
-        matched_topic_ids = []
-        for topic in existing_topics:
-            topic_keywords = set([kw.lower() for kw in topic.get('keywords', [])])
-            if any(kw.lower() in topic_keywords for kw in keywords):
-                matched_topic_ids.append(topic['topic_id'])
-                if len(matched_topic_ids) >= 3:  
-                    break
-        
-        
-        doc_dict["topics"] = matched_topic_ids[:3]
-        doc_dict["topic_names"] = keywords[:5]  
+        await topic_matcher.ensure_fresh(db.topics)
+        doc_dict = prepare_new_document(document, keywords)
         
         
         result = await db.documents.insert_one(doc_dict)
         doc_dict["_id"] = str(result.inserted_id)
+        changed_topics = document_created(doc_dict)
+        await change_events.emit(DOCUMENTS_CREATED, [doc_dict["_id"]], changed_topics)
         return serialize_doc(doc_dict)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating document: {str(e)}")
 
+@app.post("/api/documents/bulk")
+async def bulk_create_documents(request: Request):
+    try:
+        items = parse_items(await request.body(), request.headers.get("content-type"), BULK_MAX_ITEMS)
+        valid, results = validate_items(items, DocumentCreateModel)
+
+        with span("extract_keywords"):
+            keyword_lists = await asyncio.to_thread(
+                extract_keywords_batch,
+                [document.content + " " + document.title for _, _, document in valid],
+                10
+            )
+        await topic_matcher.ensure_fresh(db.topics)
+        # nothing awaits between matches, so every item sees the same topic snapshot
+        docs = []
+        for (index, _, document), keywords in zip(valid, keyword_lists):
+            doc_dict = prepare_new_document(document, keywords)
+            doc_dict["_id"] = ObjectId()
+            docs.append((index, doc_dict))
+
+        failed = {}
+        if docs:
+            try:
+                await db.documents.bulk_write([InsertOne(doc_dict) for _, doc_dict in docs], ordered=False)
+            except BulkWriteError as e:
+                failed = write_errors_by_position(e)
+
+        created = []
+        indexed = []
+        changed_topics = set()
+        for position, (index, doc_dict) in enumerate(docs):
+            if position in failed:
+                results.append(item_error(index, 500, failed[position]))
+                continue
+            doc_dict["_id"] = str(doc_dict["_id"])
+            changed_topics |= document_counts.document_added(doc_dict["topics"])
+            created.append(doc_dict["_id"])
+            indexed.append((doc_dict["_id"], doc_dict))
+            results.append({"index": index, "status": 201, "_id": doc_dict["_id"]})
+
+        await index_documents(indexed)
+        # only once indexed, so an assignment that lands first isn't overwritten
+        for _, doc_dict in indexed:
+            incremental_assigner.submit(dict(doc_dict))
+        if created:
+            await change_events.emit(DOCUMENTS_CREATED, created, changed_topics)
+        return FastJSONResponse(summarize(results))
+    except BulkBodyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating documents: {str(e)}")
+
+@app.put("/api/documents/bulk")
+async def bulk_update_documents(request: Request):
+    try:
+        items = parse_items(await request.body(), request.headers.get("content-type"), BULK_MAX_ITEMS)
+        valid, results = validate_items(items, DocumentUpdateModel, require_id=True)
+
+        updates = []
+        for index, doc_id, document in valid:
+            update_data = {k: v for k, v in document.dict().items() if v is not None}
+            if not update_data:
+                results.append(item_error(index, 400, "No fields to update", doc_id))
+                continue
+            updates.append((index, doc_id, update_data))
+
+        with_topics = [update_data for _, _, update_data in updates if "topics" in update_data]
+        for update_data, topic_names in zip(
+            with_topics, await resolve_topic_names([u["topics"] for u in with_topics])
+        ):
+            update_data["topic_names"] = topic_names
+
+        # one read for every pre-image, needed for counts and the search index
+        previous = {}
+        if updates:
+            found = await db.documents.find(
+                {"_id": {"$in": list({ObjectId(doc_id) for _, doc_id, _ in updates})}}
+            ).to_list(length=None)
+            previous = {str(doc["_id"]): doc for doc in found}
+
+        pending = []
+        for index, doc_id, update_data in updates:
+            if doc_id in previous:
+                pending.append((index, doc_id, update_data))
+            else:
+                results.append(item_error(index, 404, "Document not found", doc_id))
+
+        failed = {}
+        if pending:
+            try:
+                await db.documents.bulk_write([
+                    UpdateOne({"_id": ObjectId(doc_id)}, {"$set": update_data, "$unset": {"pending_merge": ""}})
+                    for _, doc_id, update_data in pending
+                ], ordered=False)
+            except BulkWriteError as e:
+                failed = write_errors_by_position(e)
+
+        updated = []
+        changed_topics = set()
+        for position, (index, doc_id, update_data) in enumerate(pending):
+            if position in failed:
+                results.append(item_error(index, 500, failed[position], doc_id))
+                continue
+            before = previous[doc_id]
+            after = previous[doc_id] = {**before, **update_data}
+            after.pop("pending_merge", None)
+            if "topics" in update_data:
+                changed_topics |= document_counts.topics_changed(before.get("topics"), update_data["topics"])
+            updated.append(doc_id)
+            results.append({"index": index, "status": 200, "_id": doc_id})
+
+        # an id updated twice in one request is indexed once, with its final state
+        await index_documents([(doc_id, previous[doc_id]) for doc_id in dict.fromkeys(updated)])
+        if updated:
+            await change_events.emit(DOCUMENTS_UPDATED, updated, changed_topics)
+        return FastJSONResponse(summarize(results))
+    except BulkBodyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error updating documents: {str(e)}")
+
+@app.post("/api/documents/bulk/delete")
+async def bulk_delete_documents(request: Request):
+    try:
+        items = parse_items(await request.body(), request.headers.get("content-type"), BULK_MAX_ITEMS)
+        valid, results = parse_ids(items)
+
+        topics_by_id = {}
+        if valid:
+            found = await db.documents.find(
+                {"_id": {"$in": list({ObjectId(doc_id) for _, doc_id in valid})}},
+                {"topics": 1}
+            ).to_list(length=None)
+            topics_by_id = {str(doc["_id"]): doc.get("topics") for doc in found}
+            if topics_by_id:
+                await db.documents.delete_many(
+                    {"_id": {"$in": [ObjectId(doc_id) for doc_id in topics_by_id]}}
+                )
+
+        deleted = []
+        changed_topics = set()
+        for index, doc_id in valid:
+            if doc_id not in topics_by_id:
+                results.append(item_error(index, 404, "Document not found", doc_id))
+                continue
+            search_index.remove(doc_id)
+            facet_index.remove(doc_id)
+            changed_topics |= document_counts.document_removed(topics_by_id.pop(doc_id))
+            deleted.append(doc_id)
+            results.append({"index": index, "status": 200, "_id": doc_id})
+
+        if deleted:
+            await change_events.emit(DOCUMENTS_DELETED, deleted, changed_topics)
+        return FastJSONResponse(summarize(results))
+    except BulkBodyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting documents: {str(e)}")
+
+async def document_page_response(request, base_filter, sort_by, order, cursor, skip, limit, fields, format, total, extra=None):
+    sort_field, direction = resolve_sort(sort_by, order)
+    projection = build_projection(fields, SNIPPET_LENGTH, required=(sort_field,))
+    meta = {
+        **(extra or {}),
+        "total": total,
+        "skip": skip,
+        "limit": limit,
+        "sort_by": sort_field,
+        "order": order,
+    }
+
+    if wants_ndjson(request, format):
+        page = {"next_cursor": None}
+        find = open_page(db.documents, base_filter, sort_field, direction, cursor, limit, skip, projection)
+        return ndjson_response(
+            iter_page(find, sort_field, direction, limit, page),
+            trailer=lambda: {**meta, "next_cursor": page["next_cursor"]},
+            headers={"X-Total-Count": str(total)}
+        )
+
+    documents, next_cursor = await fetch_page(
+        db.documents, base_filter, sort_field, direction, cursor, limit, skip, projection
+    )
+    return FastJSONResponse({"documents": documents, **meta, "next_cursor": next_cursor})
+
 @app.get("/api/documents")
 async def get_documents(
-    skip: int = 0,
-    limit: int = 50,
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=1000),
     sort_by: str = "date_added",
-    order: str = "desc"
+    order: str = "desc",
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: Optional[str] = None
 ):
     try:
-        sort_order = -1 if order == "desc" else 1
-        documents = await db.documents.find().sort(sort_by, sort_order).skip(skip).limit(limit).to_list(length=limit)
-        total = await db.documents.count_documents({})
-        
-        return {
-            "documents": [serialize_doc(doc) for doc in documents],
+        total = await document_counts.total_count(db.documents)
+        return await document_page_response(
+            request, {}, sort_by, order, cursor, skip, limit, fields, format, total
+        )
+    except (CursorError, ProjectionError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching documents: {str(e)}")
+
+@app.get("/api/documents/search")
+async def search_documents(
+    request: Request,
+    q: str = Query(..., min_length=1),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=1000),
+    mode: str = "lexical",
+    fields: Optional[str] = None,
+    format: Optional[str] = None
+):
+    if mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(SEARCH_MODES)}")
+    if mode == "semantic" and not semantic_search_available():
+        raise HTTPException(status_code=503, detail="Vector index is not built yet, POST /api/vectors/build first")
+    if mode == "hybrid" and not semantic_search_available():
+        # without embeddings hybrid ranking is just the lexical half
+        mode = "lexical"
+    try:
+        projection = build_projection(fields, SNIPPET_LENGTH)
+        if mode != "semantic" and not search_index.ready:
+            # the in-memory index is still being built, use Mongo's text index meanwhile
+            documents = await db.documents.find(
+                {"$text": {"$search": q}},
+                {**(projection or {}), "score": {"$meta": "textScore"}}
+            ).sort([("score", {"$meta": "textScore"})]).skip(skip).limit(limit).to_list(length=limit)
+            meta = {"query": q, "mode": mode, "count": len(documents)}
+        else:
+            total, ranked = await rank_query(q, mode, max(SEARCH_RANK_DEPTH, skip + limit))
+            documents = await hydrate_ranked(ranked[skip:skip + limit], projection)
+            meta = {"query": q, "mode": mode, "count": len(documents), "total": total, "skip": skip, "limit": limit}
+
+        if wants_ndjson(request, format):
+            return ndjson_response(documents, trailer=lambda: meta)
+        return FastJSONResponse({"documents": documents, **meta})
+    except ProjectionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching documents: {str(e)}")
+
+@app.get("/api/documents/trending")
+async def get_trending_documents(
+    limit: int = Query(20, ge=1, le=100),
+    by: str = "trending",
+    fields: Optional[str] = None
+):
+    if by not in TRENDING_SORTS:
+        raise HTTPException(status_code=400, detail=f"by must be one of: {', '.join(TRENDING_SORTS)}")
+    if by == "trending" and not popularity_tracker.trending_enabled:
+        raise HTTPException(status_code=400, detail="Trending is disabled, set TRENDING_HALF_LIFE_HOURS to enable it")
+    try:
+        projection = build_projection(fields, SNIPPET_LENGTH, required=("popularity",))
+        # both sorts walk an index from the top, no scoring happens per request
+        query = {TRENDING_FIELD: {"$exists": True}} if by == "trending" else {"popularity": {"$gt": 0}}
+        documents = await db.documents.find(query, projection).sort(
+            [(by, -1), ("_id", -1)]
+        ).limit(limit).to_list(length=limit)
+        return FastJSONResponse({"documents": documents, "by": by, "count": len(documents)})
+    except ProjectionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching trending documents: {str(e)}")
+
+@app.post("/api/documents/facets")
+async def facet_documents(request: FacetQueryRequest):
+    if request.topics_mode not in FACET_MODES:
+        raise HTTPException(status_code=400, detail=f"topics_mode must be one of: {', '.join(FACET_MODES)}")
+    if request.combine not in COMBINE_MODES:
+        raise HTTPException(status_code=400, detail=f"combine must be one of: {', '.join(COMBINE_MODES)}")
+    unknown = [field for field in request.facets or () if field not in FACET_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"facets must be among: {', '.join(FACET_FIELDS)}")
+    if not facet_index.ready:
+        raise HTTPException(status_code=503, detail="Facet index is still being built, try again shortly")
+    try:
+        projection = build_projection(request.fields, SNIPPET_LENGTH) if request.include_documents else None
+        filters = {field: getattr(request, field) for field in FACET_FIELDS if getattr(request, field)}
+        if request.year_from is not None or request.year_to is not None:
+            # a range is the set of indexed years inside it, an empty set matches nothing
+            low = request.year_from if request.year_from is not None else float("-inf")
+            high = request.year_to if request.year_to is not None else float("inf")
+            years = [year for year in facet_index.values("year") if low <= year <= high]
+            filters["year"] = [year for year in years if year in request.year] if request.year else years
+
+        with span("facets"):
+            total, doc_ids, counts = facet_index.search(
+                filters, {"topics": request.topics_mode}, request.combine,
+                request.facets, request.skip, request.limit
+            )
+        body = {
             "total": total,
-            "skip": skip,
-            "limit": limit
+            "ids": doc_ids,
+            "facets": counts,
+            "skip": request.skip,
+            "limit": request.limit,
         }
+        if request.include_documents:
+            by_id = await fetch_by_ids(doc_ids, projection)
+            body["documents"] = [by_id[doc_id] for doc_id in doc_ids if doc_id in by_id]
+        return FastJSONResponse(body)
+    except ProjectionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching documents: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error faceting documents: {str(e)}")
 
-@app.get("/api/documents/{doc_id}")
-async def get_document(doc_id: str):
+@app.get("/api/documents/{doc_id}/similar")
+async def get_similar_documents(doc_id: str, k: int = Query(10, ge=1, le=1000), fields: Optional[str] = None):
     try:
         if not ObjectId.is_valid(doc_id):
             raise HTTPException(status_code=400, detail="Invalid document ID")
-        
+        projection = build_projection(fields, SNIPPET_LENGTH)
+        vector = vector_index.vector(doc_id)
+        if vector is None:
+            raise HTTPException(status_code=404, detail="Document has no embedding yet, build the vector index first")
+
+        ranked = vector_index.search(vector, k, exclude=(doc_id,))
+        documents = await hydrate_ranked(ranked, projection)
+        return FastJSONResponse({"documents": documents, "doc_id": doc_id, "count": len(documents)})
+    except ProjectionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error finding similar documents: {str(e)}")
+
+@app.get("/api/documents/{doc_id}")
+async def get_document(request: Request, doc_id: str):
+    async def load():
         document = await db.documents.find_one({"_id": ObjectId(doc_id)})
         if not document:
             raise HTTPException(status_code=404, detail="Document not found")
-        return serialize_doc(document)
+        return document
+
+    try:
+        if not ObjectId.is_valid(doc_id):
+            raise HTTPException(status_code=400, detail="Invalid document ID")
+        
+        response = await read_cache.response(
+            request, f"document:{doc_id}", (DOCUMENTS_TAG, document_tag(doc_id)), load
+        )
+        # counted in memory and flushed in bulk, a view never waits on a write
+        popularity_tracker.hit(doc_id)
+        return response
     except HTTPException:
         raise
     except Exception as e:
@@ -455,146 +1452,223 @@ async def update_document(doc_id: str, document: DocumentUpdateModel):
         
         
         if "topics" in update_data:
-            topic_names = []
-            for topic_id in update_data["topics"]:
-                topic = await db.topics.find_one({"topic_id": topic_id})
-                if topic:
-                    topic_names.extend(topic.get("keywords", [])[:3])
-            update_data["topic_names"] = topic_names
+            update_data["topic_names"] = (await resolve_topic_names([update_data["topics"]]))[0]
         
         if not update_data:
             raise HTTPException(status_code=400, detail="No fields to update")
         
-        result = await db.documents.update_one(
+        # an edited document leaves the assign/merge queue, model topics must not overwrite the edit
+        previous_doc = await db.documents.find_one_and_update(
             {"_id": ObjectId(doc_id)},
-            {"$set": update_data}
+            {"$set": update_data, "$unset": {"pending_merge": ""}},
+            return_document=ReturnDocument.BEFORE
         )
         
-        if result.matched_count == 0:
+        if previous_doc is None:
             raise HTTPException(status_code=404, detail="Document not found")
         
-        updated_doc = await db.documents.find_one({"_id": ObjectId(doc_id)})
+        # the pre-image plus the $set fields is the stored document, no re-read needed
+        updated_doc = {**previous_doc, **update_data}
+        updated_doc.pop("pending_merge", None)
+        changed_topics = set()
+        if "topics" in update_data:
+            changed_topics = document_counts.topics_changed(previous_doc.get("topics"), update_data["topics"])
+        search_index.add(doc_id, updated_doc)
+        facet_index.add(doc_id, updated_doc)
+        await change_events.emit(DOCUMENTS_UPDATED, [doc_id], changed_topics)
         return serialize_doc(updated_doc)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating document: {str(e)}")
 
+@app.patch("/api/documents/topics")
+async def reassign_document_topics(request: TopicReassignmentRequest):
+    try:
+        invalid = []
+        assignments = []
+        for assignment in request.assignments:
+            doc_ids = []
+            for doc_id in assignment.ids:
+                (doc_ids if ObjectId.is_valid(doc_id) else invalid).append(doc_id)
+            if doc_ids:
+                assignments.append((doc_ids, assignment.topics))
+        if not assignments:
+            raise HTTPException(status_code=400, detail="No valid document IDs to update")
+
+        topic_names = await resolve_topic_names([topics for _, topics in assignments])
+        all_ids = {doc_id for doc_ids, _ in assignments for doc_id in doc_ids}
+        found = await db.documents.find(
+            {"_id": {"$in": [ObjectId(doc_id) for doc_id in all_ids]}},
+            {**{field: 1 for field in SEARCH_FIELDS}, "topics": 1}
+        ).to_list(length=None)
+        previous = {str(doc["_id"]): doc for doc in found}
+
+        # one UpdateMany per assignment, applied in order so a later assignment wins
+        result = await db.documents.bulk_write([
+            UpdateMany(
+                {"_id": {"$in": [ObjectId(doc_id) for doc_id in doc_ids]}},
+                {"$set": {"topics": topics, "topic_names": names}, "$unset": {"pending_merge": ""}}
+            )
+            for (doc_ids, topics), names in zip(assignments, topic_names)
+        ], ordered=True)
+
+        updated = []
+        not_found = []
+        changed_topics = set()
+        for (doc_ids, topics), names in zip(assignments, topic_names):
+            for doc_id in doc_ids:
+                before = previous.get(doc_id)
+                if before is None:
+                    not_found.append(doc_id)
+                    continue
+                after = previous[doc_id] = {**before, "topics": topics, "topic_names": names}
+                changed_topics |= document_counts.topics_changed(before.get("topics"), topics)
+                search_index.add(doc_id, after)
+                facet_index.add(doc_id, after)
+                updated.append(doc_id)
+
+        if updated:
+            await change_events.emit(DOCUMENTS_UPDATED, updated, changed_topics)
+        return {
+            "matched": result.matched_count,
+            "modified": result.modified_count,
+            "not_found": not_found,
+            "invalid": invalid
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reassigning topics: {str(e)}")
+
 @app.delete("/api/documents/{doc_id}")
 async def delete_document(doc_id: str):
     try:
         if not ObjectId.is_valid(doc_id):
             raise HTTPException(status_code=400, detail="Invalid document ID")
         
-        result = await db.documents.delete_one({"_id": ObjectId(doc_id)})
+        deleted_doc = await db.documents.find_one_and_delete(
+            {"_id": ObjectId(doc_id)},
+            projection={"topics": 1}
+        )
         
-        if result.deleted_count == 0:
+        if deleted_doc is None:
             raise HTTPException(status_code=404, detail="Document not found")
-        
+
+        search_index.remove(doc_id)
+
+        facet_index.remove(doc_id)
+        changed_topics = document_counts.document_removed(deleted_doc.get("topics"))
+        await change_events.emit(DOCUMENTS_DELETED, [doc_id], changed_topics)
         return {"message": "Document deleted successfully", "id": doc_id}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting document: {str(e)}")
 
-@app.get("/api/documents/search")
-async def search_documents(
-    q: str = Query(..., min_length=1),
-    skip: int = 0,
-    limit: int = 50
-):
-    try:
-        
-        documents = []
-        
-        
-        try:
-            documents = await db.documents.find(
-                {"$text": {"$search": q}},
-                {"score": {"$meta": "textScore"}}
-            ).sort([("score", {"$meta": "textScore"})]).skip(skip).limit(limit).to_list(length=limit)
-        except:
-            pass
-        
-        
-        if not documents:
-            regex_query = {
-                "$or": [
-                    {"title": {"$regex": q, "$options": "i"}},
-                    {"content": {"$regex": q, "$options": "i"}},
-                    {"genre": {"$regex": q, "$options": "i"}},
-                    {"topic_names": {"$regex": q, "$options": "i"}}
-                ]
-            }
-            documents = await db.documents.find(regex_query).skip(skip).limit(limit).to_list(length=limit)
-        
-        return {
-            "documents": [serialize_doc(doc) for doc in documents],
-            "query": q,
-            "count": len(documents)
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error searching documents: {str(e)}")
-
 @app.get("/api/documents/filter/topic/{topic_id}")
 async def filter_documents_by_topic(
+    request: Request,
     topic_id: int,
-    skip: int = 0,
-    limit: int = 50
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=1000),
+    sort_by: str = "date_added",
+    order: str = "desc",
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: Optional[str] = None
 ):
     try:
-        documents = await db.documents.find(
-            {"topics": topic_id}
-        ).skip(skip).limit(limit).to_list(length=limit)
-        
-        total = await db.documents.count_documents({"topics": topic_id})
-        
-        return {
-            "documents": [serialize_doc(doc) for doc in documents],
-            "topic_id": topic_id,
-            "total": total,
-            "skip": skip,
-            "limit": limit
-        }
+        total = await document_counts.topic_count(db.documents, topic_id)
+        return await document_page_response(
+            request, {"topics": topic_id}, sort_by, order, cursor, skip, limit, fields, format, total,
+            extra={"topic_id": topic_id}
+        )
+    except (CursorError, ProjectionError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error filtering documents: {str(e)}")
 
+@app.post("/api/search/semantic")
+async def semantic_search(request: SemanticSearchRequest):
+    if not vector_index.ready:
+        raise HTTPException(status_code=503, detail="Vector index is not built yet, POST /api/vectors/build first")
+    if not semantic_search_available():
+        raise HTTPException(
+            status_code=503,
+            detail="sentence-transformers is not installed. Please install it with: pip install sentence-transformers"
+        )
+    try:
+        projection = build_projection(request.fields, SNIPPET_LENGTH)
+        _, ranked = await rank_query(request.query, "semantic", max(SEARCH_RANK_DEPTH, request.k))
+        documents = await hydrate_ranked(ranked[:request.k], projection)
+        return FastJSONResponse({"documents": documents, "query": request.query, "count": len(documents)})
+    except ProjectionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error in semantic search: {str(e)}")
+
+@app.post("/api/vectors/build", response_model=JobResponse, status_code=202)
+async def build_vectors():
+    if not SENTENCE_TRANSFORMERS_AVAILABLE:
+        raise HTTPException(
+            status_code=503,
+            detail="sentence-transformers is not installed. Please install it with: pip install sentence-transformers"
+        )
+    active_job = job_manager.active("build_vectors")
+    if active_job:
+        raise HTTPException(status_code=409, detail=f"Vector index build already in progress: job {active_job.job_id}")
+    return submit_vector_build().to_dict()
+
+@app.get("/api/popularity")
+async def get_popularity_status():
+    return popularity_tracker.stats()
+
+@app.get("/api/workers")
+async def get_worker_status():
+    return {
+        **worker_sync.stats(),
+        "pid": os.getpid(),
+        "shared_state_preloaded": shared_state_preloaded,
+        "topic_model_version": topic_model_version,
+        "vector_index_version": vector_index.version,
+    }
+
+@app.get("/api/vectors")
+async def get_vector_index_status():
+    return vector_index.stats()
+
 @app.get("/api/csv/load")
 async def load_csv_data():
     try:
         if not os.path.exists(CSV_PATH):
             raise HTTPException(status_code=404, detail=f"CSV file not found: {CSV_PATH}")
         
-        docs_df = pd.read_csv(CSV_PATH)
-        
-        
-        await db.documents.delete_many({})
-        
-        
-        documents_to_insert = []
-        for idx, row in docs_df.iterrows():
-            doc = {
-                "story_id": int(row['id']),
-                "title": row['title'],
-                "content": row['story'],
-                "genre": row['genre'],
-                "topics": [],
-                "topic_names": [],
-                "authors": [],
-                "year": None,
-                "doi": None,
-                "date_added": datetime.utcnow(),
-                "popularity": 0
-            }
-            documents_to_insert.append(doc)
-        
-        if documents_to_insert:
-            await db.documents.insert_many(documents_to_insert)
-        
+        shadow_documents = ShadowCollection(db, "documents", create_document_indexes)
+        try:
+            stats = await stream_csv_to_collection(
+                shadow_documents.collection,
+                CSV_PATH,
+                chunk_size=INGEST_CHUNK_SIZE,
+                batch_size=INGEST_BATCH_SIZE,
+                max_in_flight=INGEST_MAX_IN_FLIGHT,
+            )
+            await commit_corpus(shadow_documents)
+        except Exception:
+            await shadow_documents.discard()
+            raise
+
+        await change_events.emit(CORPUS_RELOADED)
+
         return {
             "message": "CSV data loaded successfully",
-            "documents_loaded": len(documents_to_insert)
+            "documents_loaded": stats.rows,
+            "ingest": stats.to_dict()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading CSV: {str(e)}")
 
@@ -602,21 +1676,24 @@ async def load_csv_data():
 async def suggest_topics(request: TopicSuggestionRequest):
     try:
         
-        keywords = extract_keywords(request.content, num_keywords=request.num_topics)
-        
-        
-        existing_topics = await db.topics.find().to_list(length=None)
-        
-        
-        suggested_topic_ids = []
-        for topic in existing_topics:
-            topic_keywords = set(topic.get('keywords', []))
-            if any(kw in topic_keywords for kw in keywords):
-                suggested_topic_ids.append(topic['topic_id'])
-        
+        with span("extract_keywords"):
+            keywords = extract_keywords(request.content, num_keywords=request.num_topics)
+
+        model = await ensure_topic_model()
+        if model is not None:
+            with span("rank_topics"):
+                suggested_topic_ids = await asyncio.to_thread(rank_topics, model, request.content, 5)
+        else:
+            await topic_matcher.ensure_fresh(db.topics)
+            with span("topic_match"):
+                suggested_topic_ids = topic_matcher.match(keywords, limit=5)
+
         return TopicSuggestionResponse(
             keywords=keywords,
-            suggested_topic_ids=suggested_topic_ids[:5]
+            suggested_topic_ids=suggested_topic_ids
         )
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error suggesting topics: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error suggesting topics: {str(e)}")
+
+
+metrics.IMPORT_SECONDS.set(time.perf_counter() - _import_started)
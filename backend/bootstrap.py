@@ -0,0 +1,145 @@
+import asyncio
+import multiprocessing
+import os
+import pickle
+import tempfile
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from pymongo import UpdateOne
+
+from keywords import extract_keywords_batch
+
+
+def keyword_text(doc):
+    return (doc.get('content') or '') + ' ' + (doc.get('title') or '')
+
+
+async def _document_batches(collection, batch_size):
+    batch = []
+    async for doc in collection.find({}, {"title": 1, "content": 1}).batch_size(batch_size):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def bootstrap_simple_topics(
+    db,
+    num_topics=30,
+    keywords_per_doc=10,
+    batch_size=2000,
+    write_batch_size=1000,
+    workers=None,
+    progress=None,
+):
+    topic_count = await db.topics.count_documents({})
+    if topic_count > 0:
+        print(f"Topics already exist: {topic_count} topics")
+        return []
+
+    print("Generating simple keyword-based topics from documents...")
+    total = await db.documents.estimated_document_count()
+
+    # only the keyword counts stay in memory; each batch's ids and keywords are
+    # spilled to disk and read back for the writes, so no document is tokenized twice
+    keyword_freq = Counter()
+    seen = 0
+
+    with tempfile.TemporaryFile() as spill:
+        def collect(ids, keywords):
+            nonlocal seen
+            for kws in keywords:
+                keyword_freq.update(kws)
+            pickle.dump((ids, keywords), spill, protocol=pickle.HIGHEST_PROTOCOL)
+            seen += len(ids)
+            if progress and total:
+                progress("extracting_keywords", 0.6 * seen / total)
+
+        await _extract_keywords(db, batch_size, keywords_per_doc, workers, collect)
+
+        if not seen:
+            print("No documents found to generate topics from")
+            return []
+
+        topics_to_insert = []
+        for topic_id, (keyword, freq) in enumerate(keyword_freq.most_common(num_topics)):
+            topics_to_insert.append({
+                "topic_id": topic_id,
+                "name": keyword.capitalize(),
+                "keywords": [keyword],
+                "count": freq,
+                "representative_docs": []
+            })
+
+        if not topics_to_insert:
+            return []
+
+        await db.topics.insert_many(topics_to_insert)
+        print(f"Generated {len(topics_to_insert)} simple topics")
+
+        spill.seek(0)
+        await _assign_topics(db, topics_to_insert, _spilled_batches(spill), seen, write_batch_size, progress)
+
+    print("Updated documents with topic assignments")
+    return topics_to_insert
+
+
+def _spilled_batches(spill):
+    while True:
+        try:
+            yield pickle.load(spill)
+        except EOFError:
+            return
+
+
+async def _extract_keywords(db, batch_size, keywords_per_doc, workers, collect):
+    loop = asyncio.get_running_loop()
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        # every document is tokenized exactly once, results are consumed in submission
+        # order so keyword frequencies (and topic ids) are deterministic
+        pending = deque()
+        max_pending = workers * 2
+        async for batch in _document_batches(db.documents, batch_size):
+            ids = [doc["_id"] for doc in batch]
+            texts = [keyword_text(doc) for doc in batch]
+            future = loop.run_in_executor(pool, extract_keywords_batch, texts, keywords_per_doc)
+            pending.append((ids, future))
+            if len(pending) >= max_pending:
+                ids, future = pending.popleft()
+                collect(ids, await future)
+        while pending:
+            ids, future = pending.popleft()
+            collect(ids, await future)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def _assign_topics(db, topics_to_insert, batches, total, write_batch_size, progress):
+    topic_by_keyword = {topic["keywords"][0]: topic["topic_id"] for topic in topics_to_insert}
+    operations = []
+    written = 0
+    for ids, keywords in batches:
+        for doc_id, kws in zip(ids, keywords):
+            matching_topics = sorted({topic_by_keyword[kw] for kw in kws if kw in topic_by_keyword})[:3]
+            if not matching_topics:
+                continue
+            operations.append(UpdateOne(
+                {"_id": doc_id},
+                {"$set": {
+                    "topics": matching_topics,
+                    "topic_names": [topics_to_insert[tid]["keywords"][0] for tid in matching_topics]
+                }}
+            ))
+            if len(operations) >= write_batch_size:
+                await db.documents.bulk_write(operations, ordered=False)
+                written += len(operations)
+                operations = []
+                if progress:
+                    progress("assigning_topics", 0.6 + 0.4 * written / total)
+    if operations:
+        await db.documents.bulk_write(operations, ordered=False)
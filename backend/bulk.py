@@ -0,0 +1,90 @@
+from bson import ObjectId
+from pydantic import ValidationError
+
+from responses import NDJSON_MEDIA_TYPE, loads
+
+
+class BulkBodyError(ValueError):
+    pass
+
+
+def parse_items(body, content_type="", max_items=100000):
+    # NDJSON for streaming producers, a JSON array for everyone else
+    try:
+        if NDJSON_MEDIA_TYPE in (content_type or ""):
+            items = [loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = loads(body) if body.strip() else []
+    except ValueError as e:
+        raise BulkBodyError(f"Invalid request body: {str(e)}")
+    if not isinstance(items, list):
+        raise BulkBodyError("Request body must be a JSON array or NDJSON")
+    if len(items) > max_items:
+        raise BulkBodyError(f"At most {max_items} items per request")
+    return items
+
+
+def item_error(index, status, error, doc_id=None):
+    result = {"index": index, "status": status, "error": error}
+    if doc_id is not None:
+        result["_id"] = doc_id
+    return result
+
+
+def validation_message(error):
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc']) or 'body'}: {e['msg']}"
+        for e in error.errors()
+    )
+
+
+def validate_items(items, model, require_id=False):
+    valid = []
+    errors = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append(item_error(index, 400, "Item must be a JSON object"))
+            continue
+        doc_id = None
+        if require_id:
+            doc_id = item.get("_id") or item.get("id")
+            if not isinstance(doc_id, str) or not ObjectId.is_valid(doc_id):
+                errors.append(item_error(index, 400, "Invalid document ID", doc_id))
+                continue
+            item = {k: v for k, v in item.items() if k not in ("_id", "id")}
+        try:
+            valid.append((index, doc_id, model(**item)))
+        except ValidationError as e:
+            errors.append(item_error(index, 400, validation_message(e), doc_id))
+    return valid, errors
+
+
+def parse_ids(items):
+    valid = []
+    errors = []
+    for index, item in enumerate(items):
+        doc_id = item.get("_id") or item.get("id") if isinstance(item, dict) else item
+        if not isinstance(doc_id, str) or not ObjectId.is_valid(doc_id):
+            errors.append(item_error(index, 400, "Invalid document ID"))
+        else:
+            valid.append((index, doc_id))
+    return valid, errors
+
+
+def write_errors_by_position(error):
+    # BulkWriteError reports failures by position in the operations list
+    return {
+        e["index"]: e.get("errmsg", "Write failed")
+        for e in error.details.get("writeErrors", [])
+    }
+
+
+def summarize(results):
+    results.sort(key=lambda result: result["index"])
+    failed = sum(1 for result in results if result["status"] >= 400)
+    return {
+        "total": len(results),
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "results": results,
+    }
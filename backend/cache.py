@@ -0,0 +1,195 @@
+import hashlib
+import itertools
+import math
+import time
+from collections import OrderedDict
+
+from fastapi.responses import Response
+
+from events import DOCUMENTS_CREATED, DOCUMENTS_UPDATED, DOCUMENTS_DELETED, TOPICS_CHANGED, CORPUS_RELOADED
+from responses import dumps
+from metrics import span
+
+try:
+    import redis.asyncio as redis_asyncio
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+TOPICS_TAG = "topics"
+DOCUMENTS_TAG = "documents"
+
+
+def document_tag(doc_id):
+    return f"document:{doc_id}"
+
+
+def make_etag(body):
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+class MemoryCacheBackend:
+    def __init__(self, max_entries=10000, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        # tag -> (version, expires_at), oldest bump first
+        self._tags = OrderedDict()
+        self._versions = itertools.count(1)
+
+    def __len__(self):
+        return len(self._entries)
+
+    async def tag_versions(self, tags):
+        now = time.monotonic()
+        versions = []
+        for tag in tags:
+            version, expires_at = self._tags.get(tag, (0, now))
+            versions.append(version if expires_at >= now else 0)
+        return versions
+
+    async def bump(self, tags, ttl_seconds):
+        now = time.monotonic()
+        for tag in tags:
+            self._tags[tag] = (next(self._versions), now + ttl_seconds)
+            self._tags.move_to_end(tag)
+        # every bump uses the same ttl, so the expired tags are the oldest ones
+        while self._tags:
+            tag, (_, expires_at) = next(iter(self._tags.items()))
+            if expires_at >= now:
+                break
+            del self._tags[tag]
+
+    async def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, etag, body = entry
+        if expires_at < time.monotonic():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return etag, body
+
+    async def set(self, key, etag, body, ttl_seconds):
+        if len(body) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (time.monotonic() + ttl_seconds, etag, body)
+        self._bytes += len(body)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _drop(self, key):
+        _, _, body = self._entries.pop(key)
+        self._bytes -= len(body)
+
+    def stats(self):
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "evictions": self.evictions,
+            "tags": len(self._tags),
+        }
+
+
+class RedisCacheBackend:
+    def __init__(self, url, prefix="neurodoc:cache:"):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("redis is not installed, install it to use CACHE_REDIS_URL")
+        self.client = redis_asyncio.from_url(url)
+        self.prefix = prefix
+
+    async def tag_versions(self, tags):
+        values = await self.client.mget([self.prefix + "tag:" + tag for tag in tags])
+        return [int(value) if value else 0 for value in values]
+
+    async def bump(self, tags, ttl_seconds):
+        version = await self.client.incr(self.prefix + "tag_version")
+        pipe = self.client.pipeline(transaction=False)
+        for tag in tags:
+            pipe.set(self.prefix + "tag:" + tag, version, ex=max(1, math.ceil(ttl_seconds)))
+        await pipe.execute()
+
+    async def get(self, key):
+        value = await self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        etag, _, body = value.partition(b"\n")
+        return etag.decode("ascii"), body
+
+    async def set(self, key, etag, body, ttl_seconds):
+        await self.client.set(self.prefix + key, etag.encode("ascii") + b"\n" + body, ex=max(1, int(ttl_seconds)))
+
+    def stats(self):
+        return {"backend": "redis"}
+
+
+class ReadCache:
+    def __init__(self, backend, ttl_seconds=30):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    async def fetch(self, key, tags, loader):
+        # invalidation bumps a tag version, so entries keyed on older versions
+        # are never read again and age out through the TTL/LRU; versions are drawn
+        # from one sequence and never repeat, so a tag can expire back to 0 once
+        # every entry cached before its bump has aged out
+        versions = await self.backend.tag_versions(tags)
+        versioned_key = f"{key}@{'.'.join(map(str, versions))}"
+        entry = await self.backend.get(versioned_key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        content = await loader()
+        with span("serialize"):
+            body = dumps(content)
+        etag = make_etag(body)
+        await self.backend.set(versioned_key, etag, body, self.ttl_seconds)
+        return etag, body
+
+    async def response(self, request, key, tags, loader):
+        etag, body = await self.fetch(key, tags, loader)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    async def invalidate(self, *tags):
+        self.invalidations += 1
+        # the new version has to outlive every entry cached under the one it replaces
+        await self.backend.bump(tags, self.ttl_seconds + 1)
+
+    async def on_change(self, event, doc_ids, topic_ids):
+        if event in (DOCUMENTS_CREATED, DOCUMENTS_UPDATED, DOCUMENTS_DELETED):
+            # cached topics carry document counts, so membership changes stale them too
+            tags = [document_tag(doc_id) for doc_id in doc_ids]
+            await self.invalidate(*(tags + [TOPICS_TAG] if topic_ids else tags))
+        elif event in (TOPICS_CHANGED, CORPUS_RELOADED):
+            await self.invalidate(TOPICS_TAG, DOCUMENTS_TAG)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations,
+            "ttl_seconds": self.ttl_seconds,
+            **self.backend.stats(),
+        }
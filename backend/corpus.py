@@ -0,0 +1,77 @@
+import time
+
+from pagination import SORTABLE_FIELDS
+from popularity import TRENDING_FIELD
+
+
+SHADOW_SEPARATOR = "__shadow_"
+
+
+async def create_document_indexes(collection):
+    await collection.create_index([("title", "text"), ("content", "text")])
+    await collection.create_index("topics")
+    await collection.create_index("topic_names")
+    await collection.create_index("pending_merge", sparse=True)
+    # keyset pagination walks (sort key, _id) so every page is an index seek
+    for field in SORTABLE_FIELDS:
+        await collection.create_index([(field, 1), ("_id", 1)])
+        await collection.create_index([("topics", 1), (field, 1), ("_id", 1)])
+    # only viewed documents carry a trending score
+    await collection.create_index([(TRENDING_FIELD, -1), ("_id", -1)], sparse=True)
+
+
+async def create_topic_indexes(collection):
+    await collection.create_index("topic_id", unique=True)
+
+
+class ShadowCollection:
+    def __init__(self, db, target, build_indexes=None):
+        self.db = db
+        self.target = target
+        self.name = f"{target}{SHADOW_SEPARATOR}{int(time.time() * 1000)}"
+        self.collection = db[self.name]
+        self.build_indexes = build_indexes
+
+    async def prepare(self):
+        # indexes are built once over the loaded data, not maintained per insert
+        if self.build_indexes:
+            await self.build_indexes(self.collection)
+
+    async def swap(self):
+        # renameCollection with dropTarget swaps the data in as one step,
+        # readers see either the old collection or the new one
+        await self.collection.rename(self.target, dropTarget=True)
+
+    async def discard(self):
+        await self.collection.drop()
+
+
+async def commit_shadows(gate, *shadows, swapped=None):
+    # all index builds happen first so the renames run back to back, and requests
+    # arriving between them wait on the gate until every collection is in place;
+    # swapped() runs inside the gate too, for state that must change with the data
+    for shadow in shadows:
+        await shadow.prepare()
+    gate.clear()
+    try:
+        for shadow in shadows:
+            await shadow.swap()
+        if swapped:
+            await swapped()
+    finally:
+        gate.set()
+
+
+async def drop_stale_shadows(db, max_age_seconds=6 * 3600):
+    dropped = []
+    now_ms = int(time.time() * 1000)
+    for name in await db.list_collection_names():
+        if SHADOW_SEPARATOR not in name:
+            continue
+        created_ms = name.rsplit(SHADOW_SEPARATOR, 1)[1]
+        if not created_ms.isdigit() or now_ms - int(created_ms) > max_age_seconds * 1000:
+            await db.drop_collection(name)
+            dropped.append(name)
+    if dropped:
+        print(f"Dropped abandoned shadow collections: {', '.join(dropped)}")
+    return dropped
@@ -0,0 +1,130 @@
+import asyncio
+from collections import Counter
+
+from pymongo import UpdateOne
+
+
+class DocumentCounts:
+    def __init__(self, flush_interval_seconds=5.0):
+        self.flush_interval_seconds = flush_interval_seconds
+        self.total = 0
+        self.by_topic = Counter()
+        self.ready = False
+        self._dirty = set()
+        self._pending = []
+        self._lock = asyncio.Lock()
+        self._task = None
+        self._generation = 0
+
+    def _apply(self, total_delta, removed, added):
+        self.total += total_delta
+        for topic_id in removed:
+            self.by_topic[topic_id] -= 1
+            if self.by_topic[topic_id] <= 0:
+                del self.by_topic[topic_id]
+        for topic_id in added:
+            self.by_topic[topic_id] += 1
+        self._dirty.update(removed)
+        self._dirty.update(added)
+
+    def _record(self, total_delta, removed=(), added=()):
+        removed, added = set(removed or ()), set(added or ())
+        if self._lock.locked():
+            # a rebuild is counting the collection, replay once it finishes;
+            # a write racing the scan can be counted twice until the next rebuild
+            self._pending.append((total_delta, removed, added))
+        if self.ready:
+            self._apply(total_delta, removed, added)
+        return removed | added
+
+    def document_added(self, topics):
+        return self._record(1, added=topics)
+
+    def document_removed(self, topics):
+        return self._record(-1, removed=topics)
+
+    def topics_changed(self, old_topics, new_topics):
+        old_topics, new_topics = set(old_topics or ()), set(new_topics or ())
+        return self._record(0, old_topics - new_topics, new_topics - old_topics)
+
+    async def rebuild(self, collection):
+        async with self._lock:
+            generation = self._generation
+            self._pending = []
+            counted = await self.build(collection)
+            if generation == self._generation:
+                self.install(counted)
+                for change in self._pending:
+                    self._apply(*change)
+            self._pending = []
+
+    async def build(self, collection):
+        # counts over collection, e.g. a shadow corpus, left for the caller to install()
+        total = await collection.count_documents({})
+        by_topic = Counter()
+        async for row in collection.aggregate([
+            {"$unwind": "$topics"},
+            {"$group": {"_id": "$topics", "count": {"$sum": 1}}},
+        ]):
+            by_topic[row["_id"]] = row["count"]
+        return total, by_topic
+
+    def install(self, counted):
+        total, by_topic = counted
+        self._dirty = set(self.by_topic) | set(by_topic)
+        self.total, self.by_topic = total, by_topic
+        self.ready = True
+        self._generation += 1
+        print(f"Document counts built: {self.total} documents, {len(self.by_topic)} topics")
+
+    async def total_count(self, collection):
+        if self.ready:
+            return self.total
+        return await collection.estimated_document_count()
+
+    async def topic_count(self, collection, topic_id):
+        if self.ready:
+            return self.by_topic.get(topic_id, 0)
+        return await collection.count_documents({"topics": topic_id})
+
+    def fill_topic_count(self, topic):
+        # the stored count lags by up to one flush interval
+        if self.ready and "topic_id" in topic:
+            topic["count"] = self.by_topic.get(topic["topic_id"], 0)
+        return topic
+
+    async def flush(self, topics_collection):
+        if not self.ready or not self._dirty:
+            return 0
+        dirty, self._dirty = self._dirty, set()
+        operations = [
+            UpdateOne({"topic_id": topic_id}, {"$set": {"count": self.by_topic.get(topic_id, 0)}})
+            for topic_id in dirty
+        ]
+        try:
+            await topics_collection.bulk_write(operations, ordered=False)
+        except Exception:
+            self._dirty |= dirty
+            raise
+        return len(operations)
+
+    def start(self, topics_collection):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(topics_collection))
+
+    async def stop(self, topics_collection=None):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if topics_collection is not None:
+            await self.flush(topics_collection)
+
+    async def _run(self, topics_collection):
+        # topic.count is written behind, the API reads the in-memory counters
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            try:
+                await self.flush(topics_collection)
+            except Exception as e:
+                print(f"Error flushing topic counts: {str(e)}")
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    # Windows has no flock, msvcrt byte-range locks do the same job there
+    fcntl = None
+    import msvcrt
+
+
+KEY_DTYPE = "S32"
+META_FILE = "meta.json"
+VECTORS_FILE = "vectors.f32"
+KEYS_FILE = "keys.bin"
+USED_FILE = "used.i64"
+LOCK_FILE = "lock"
+
+
+def lock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        return
+    f.seek(0)
+    while True:
+        try:
+            # LK_LOCK gives up after ~10 s of retries, keep waiting like flock does
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue
+
+
+def unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_UN)
+        return
+    f.seek(0)
+    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def content_key(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest().encode("ascii")
+
+
+class EmbeddingStore:
+    def __init__(self, root, namespace, capacity=1_000_000, grow_rows=16384):
+        self.dir = os.path.join(root, re.sub(r"[^A-Za-z0-9_.-]", "_", namespace))
+        self.capacity = capacity
+        self.grow_rows = grow_rows
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.dim = None
+        self._rows = {}
+        self._allocated = 0
+        self._generation = -1
+        self._clock = 0
+        self._vectors = None
+        self._keys = None
+        self._used = None
+        self._lock = threading.Lock()
+        os.makedirs(self.dir, exist_ok=True)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def stats(self):
+        with self._lock, self._file_lock():
+            self._sync()
+        return {
+            "entries": len(self._rows),
+            "allocated_rows": self._allocated,
+            "capacity": self.capacity,
+            "dim": self.dim,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    @contextmanager
+    def _file_lock(self):
+        # several processes (API, fit workers) share one store on disk
+        with open(os.path.join(self.dir, LOCK_FILE), "a+") as f:
+            lock_file(f)
+            try:
+                yield
+            finally:
+                unlock_file(f)
+
+    def _read_meta(self):
+        try:
+            with open(os.path.join(self.dir, META_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"generation": 0, "allocated": 0, "dim": None}
+
+    def _write_meta(self):
+        self._generation += 1
+        tmp = os.path.join(self.dir, META_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"generation": self._generation, "allocated": self._allocated, "dim": self.dim}, f)
+        os.replace(tmp, os.path.join(self.dir, META_FILE))
+
+    def _map(self, allocated):
+        path = lambda name: os.path.join(self.dir, name)
+        for name, row_bytes in ((VECTORS_FILE, self.dim * 4), (KEYS_FILE, 32), (USED_FILE, 8)):
+            with open(path(name), "ab") as f:
+                if f.tell() < allocated * row_bytes:
+                    f.truncate(allocated * row_bytes)
+        self._vectors = np.memmap(path(VECTORS_FILE), dtype=np.float32, mode="r+", shape=(allocated, self.dim))
+        self._keys = np.memmap(path(KEYS_FILE), dtype=KEY_DTYPE, mode="r+", shape=(allocated,))
+        self._used = np.memmap(path(USED_FILE), dtype=np.int64, mode="r+", shape=(allocated,))
+        self._allocated = allocated
+
+    def _sync(self):
+        meta = self._read_meta()
+        if meta["generation"] == self._generation:
+            return
+        self.dim = meta["dim"]
+        if self.dim is None or not meta["allocated"]:
+            self._rows = {}
+            self._allocated = 0
+        else:
+            self._map(meta["allocated"])
+            keys = np.asarray(self._keys)
+            filled = np.flatnonzero(keys != b"")
+            self._rows = dict(zip(keys[filled].tolist(), filled.tolist()))
+            self._clock = int(np.max(self._used)) if len(self._used) else 0
+        self._generation = meta["generation"]
+
+    def _allocate(self, count):
+        free = self._allocated - len(self._rows)
+        if free < count and self._allocated < self.capacity:
+            grown = min(self.capacity, max(self._allocated * 2, self._allocated + count, self.grow_rows))
+            self._map(grown)
+        keys = np.asarray(self._keys)
+        rows = np.flatnonzero(keys == b"")[:count].tolist()
+        if len(rows) < count:
+            # evict the least recently used entries to make room
+            needed = count - len(rows)
+            filled = np.flatnonzero(keys != b"")
+            used = np.asarray(self._used)[filled]
+            victims = filled[np.argpartition(used, needed - 1)[:needed]] if needed < len(filled) else filled
+            for row in victims.tolist():
+                del self._rows[bytes(self._keys[row])]
+                self._keys[row] = b""
+            self.evictions += len(victims)
+            rows.extend(victims.tolist())
+        return rows
+
+    def get(self, texts):
+        keys = [content_key(text) for text in texts]
+        with self._lock, self._file_lock():
+            self._sync()
+            result = [None] * len(keys)
+            for i, key in enumerate(keys):
+                row = self._rows.get(key)
+                if row is not None:
+                    result[i] = np.array(self._vectors[row])
+            return result
+
+    def embed(self, texts, encode, batch_size=256):
+        texts = list(texts)
+        keys = [content_key(text) for text in texts]
+
+        with self._lock, self._file_lock():
+            self._sync()
+            hit_positions = [i for i, key in enumerate(keys) if key in self._rows]
+            hits = None
+            if hit_positions and self.dim:
+                rows = [self._rows[keys[i]] for i in hit_positions]
+                hits = np.array(self._vectors[rows])
+                self._clock += 1
+                self._used[rows] = self._clock
+
+        # every position of a cached key is a hit, so misses are deduplicated by key
+        hit_set = set(hit_positions)
+        missing = {}
+        for i, key in enumerate(keys):
+            if i not in hit_set and key not in missing:
+                missing[key] = texts[i]
+        missing_keys = list(missing)
+
+        new_vectors = {}
+        if missing_keys:
+            encoded = []
+            for start in range(0, len(missing_keys), batch_size):
+                chunk = [missing[k] for k in missing_keys[start:start + batch_size]]
+                encoded.append(np.asarray(encode(chunk), dtype=np.float32))
+            vectors = np.vstack(encoded)
+            new_vectors = dict(zip(missing_keys, vectors))
+            self._store(missing_keys, vectors)
+
+        self.hits += len(hit_positions)
+        self.misses += len(texts) - len(hit_positions)
+
+        dim = hits.shape[1] if hits is not None else (self.dim or 0)
+        result = np.empty((len(texts), dim), dtype=np.float32)
+        if hits is not None:
+            result[hit_positions] = hits
+        for i, key in enumerate(keys):
+            if i not in hit_set:
+                result[i] = new_vectors[key]
+        return result
+
+    def _store(self, keys, vectors):
+        with self._lock, self._file_lock():
+            self._sync()
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+            keys_vectors = [(k, v) for k, v in zip(keys, vectors) if k not in self._rows]
+            keys_vectors = keys_vectors[-self.capacity:]
+            if not keys_vectors:
+                return
+            rows = self._allocate(len(keys_vectors))
+            self._clock += 1
+            for row, (key, vector) in zip(rows, keys_vectors):
+                self._vectors[row] = vector
+                self._keys[row] = key
+                self._used[row] = self._clock
+                self._rows[key] = row
+            self._vectors.flush()
+            self._keys.flush()
+            self._used.flush()
+            self._write_meta()
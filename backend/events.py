@@ -0,0 +1,26 @@
+DOCUMENTS_CREATED = "documents_created"
+DOCUMENTS_UPDATED = "documents_updated"
+DOCUMENTS_DELETED = "documents_deleted"
+TOPICS_CHANGED = "topics_changed"
+CORPUS_RELOADED = "corpus_reloaded"
+VECTORS_BUILT = "vectors_built"
+
+
+class ChangeEvents:
+    def __init__(self):
+        self._handlers = []
+
+    def subscribe(self, handler):
+        self._handlers.append(handler)
+        return handler
+
+    async def emit(self, event, doc_ids=(), topic_ids=()):
+        # topic_ids are the topics whose membership the write changed
+        doc_ids = [str(doc_id) for doc_id in doc_ids]
+        topic_ids = set(topic_ids)
+        for handler in self._handlers:
+            try:
+                await handler(event, doc_ids, topic_ids)
+            except Exception as e:
+                # a failing subscriber must not fail the write that fired the event
+                print(f"Error handling {event} event: {str(e)}")
@@ -0,0 +1,325 @@
+import asyncio
+
+import numpy as np
+
+
+FACET_FIELDS = ("genre", "topics", "year")
+MULTI_VALUED = ("topics",)
+FACET_MODES = ("any", "all")
+COMBINE_MODES = ("and", "or")
+WORD_BITS = 64
+
+
+def popcount_rows(matrix):
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(matrix).sum(axis=-1, dtype=np.int64)
+    return np.unpackbits(matrix.view(np.uint8), axis=-1).sum(axis=-1, dtype=np.int64)
+
+
+def bit_positions(bitmap):
+    # bit i of word w is ordinal w * 64 + i; only words with members are unpacked
+    words = np.flatnonzero(bitmap)
+    bits = np.unpackbits(bitmap[words].view(np.uint8), bitorder="little").reshape(len(words), WORD_BITS)
+    word_idx, bit_idx = np.nonzero(bits)
+    return words[word_idx] * WORD_BITS + bit_idx
+
+
+def facet_values(doc, field):
+    value = doc.get(field)
+    if value is None:
+        return ()
+    if isinstance(value, list):
+        return tuple(dict.fromkeys(v for v in value if v is not None))
+    return (value,)
+
+
+class FacetField:
+    def __init__(self, words, multi_valued=False):
+        self.values = []
+        self.rows = {}
+        # one bitset per facet value, stacked so a whole field is counted in one pass
+        self.matrix = np.zeros((8, words), dtype=np.uint64)
+        # single-valued fields also keep each document's value row, so counting a
+        # result is a bincount over its members rather than a pass over every bitset
+        self.codes = None if multi_valued else np.full(words * WORD_BITS, -1, dtype=np.int32)
+
+    def row(self, value, create=False):
+        row = self.rows.get(value)
+        if row is None and create:
+            row = len(self.values)
+            if row == len(self.matrix):
+                grown = np.zeros((row * 2, self.matrix.shape[1]), dtype=np.uint64)
+                grown[:row] = self.matrix
+                self.matrix = grown
+            self.values.append(value)
+            self.rows[value] = row
+        return row
+
+    def bitmaps(self):
+        return self.matrix[:len(self.values)]
+
+    def grow(self, words):
+        grown = np.zeros((len(self.matrix), words), dtype=np.uint64)
+        grown[:, :self.matrix.shape[1]] = self.matrix
+        self.matrix = grown
+        if self.codes is not None:
+            codes = np.full(words * WORD_BITS, -1, dtype=np.int32)
+            codes[:len(self.codes)] = self.codes
+            self.codes = codes
+
+    def clear_bits(self, ordinals):
+        mask = np.zeros(self.matrix.shape[1], dtype=np.uint64)
+        np.bitwise_or.at(mask, ordinals >> 6, np.left_shift(np.uint64(1), (ordinals & 63).astype(np.uint64)))
+        self.matrix &= ~mask
+        if self.codes is not None:
+            self.codes[ordinals] = -1
+
+    def clear_bit(self, ord_):
+        word, mask = ord_ >> 6, np.uint64(1 << (ord_ & 63))
+        rows = np.flatnonzero(self.bitmaps()[:, word] & mask)
+        self.matrix[rows, word] &= ~mask
+        if self.codes is not None:
+            self.codes[ord_] = -1
+
+    def set_bits(self, value, ordinals):
+        row = self.row(value, create=True)
+        np.bitwise_or.at(
+            self.matrix[row],
+            ordinals >> 6,
+            np.left_shift(np.uint64(1), (ordinals & 63).astype(np.uint64))
+        )
+        if self.codes is not None:
+            self.codes[ordinals] = row
+
+    def counts(self, bitmap, ordinals):
+        if self.codes is not None:
+            codes = self.codes[ordinals]
+            return np.bincount(codes[codes >= 0], minlength=len(self.values))
+        # selective filters leave most words empty, those columns are skipped outright
+        words = np.flatnonzero(bitmap)
+        if len(words) < len(bitmap) // 2:
+            return popcount_rows(self.bitmaps()[:, words] & bitmap[words])
+        return popcount_rows(self.bitmaps() & bitmap)
+
+
+class BitmapIndex:
+    def __init__(self, fields=FACET_FIELDS, words=1024):
+        self.fields = {field: FacetField(words, field in MULTI_VALUED) for field in fields}
+        self.live = np.zeros(words, dtype=np.uint64)
+        self.doc_ids = []
+        self.ords = {}
+        self.deleted = 0
+
+    def __len__(self):
+        return len(self.ords)
+
+    @property
+    def words(self):
+        return len(self.live)
+
+    def _ordinal(self, doc_id):
+        ord_ = self.ords.get(doc_id)
+        if ord_ is None:
+            ord_ = len(self.doc_ids)
+            if ord_ >= self.words * WORD_BITS:
+                words = self.words * 2
+                for facet in self.fields.values():
+                    facet.grow(words)
+                live = np.zeros(words, dtype=np.uint64)
+                live[:self.words] = self.live
+                self.live = live
+            self.doc_ids.append(doc_id)
+            self.ords[doc_id] = ord_
+            self.live[ord_ >> 6] |= np.uint64(1 << (ord_ & 63))
+        return ord_
+
+    def add(self, doc_id, doc):
+        # only fields present in doc are touched, partial projections leave the rest alone
+        ord_ = self._ordinal(doc_id)
+        ordinal = np.array([ord_], dtype=np.int64)
+        for field, facet in self.fields.items():
+            if field not in doc:
+                continue
+            facet.clear_bit(ord_)
+            for value in facet_values(doc, field):
+                facet.set_bits(value, ordinal)
+
+    def add_many(self, docs):
+        # bulk load: one vectorized bit-set per facet value instead of one per document;
+        # like add(), documents already indexed have only the fields they carry replaced
+        by_value = {field: {} for field in self.fields}
+        replaced = {field: [] for field in self.fields}
+        for doc_id, doc in docs:
+            indexed = doc_id in self.ords
+            ord_ = self._ordinal(doc_id)
+            for field, values in by_value.items():
+                if field not in doc:
+                    continue
+                if indexed:
+                    replaced[field].append(ord_)
+                for value in facet_values(doc, field):
+                    values.setdefault(value, []).append(ord_)
+        for field, values in by_value.items():
+            facet = self.fields[field]
+            if replaced[field]:
+                facet.clear_bits(np.array(replaced[field], dtype=np.int64))
+            for value, ordinals in values.items():
+                facet.set_bits(value, np.array(ordinals, dtype=np.int64))
+
+    def remove(self, doc_id):
+        ord_ = self.ords.pop(doc_id, None)
+        if ord_ is None:
+            return False
+        self.live[ord_ >> 6] &= ~np.uint64(1 << (ord_ & 63))
+        for facet in self.fields.values():
+            facet.clear_bit(ord_)
+        self.doc_ids[ord_] = None
+        self.deleted += 1
+        if self.deleted > 10000 and self.deleted > len(self.ords):
+            self.compact()
+        return True
+
+    def compact(self):
+        keep = bit_positions(self.live)
+        fresh = BitmapIndex(tuple(self.fields), words=max(1024, -(-len(keep) // WORD_BITS)))
+        for field, facet in self.fields.items():
+            for value, bitmap in zip(facet.values, facet.bitmaps()):
+                # a member's new ordinal is its rank among the surviving documents
+                members = np.flatnonzero(np.isin(keep, bit_positions(bitmap), assume_unique=True))
+                if len(members):
+                    fresh.fields[field].set_bits(value, members)
+        for ord_ in keep.tolist():
+            fresh._ordinal(self.doc_ids[ord_])
+        self.__dict__.update(fresh.__dict__)
+
+    def select(self, filters, modes=None, combine="and"):
+        modes = modes or {}
+        selected = []
+        for field, values in filters.items():
+            facet = self.fields[field]
+            rows = [facet.rows[value] for value in values if value in facet.rows]
+            if modes.get(field, "any") == "all":
+                bitmap = (
+                    np.bitwise_and.reduce(facet.matrix[rows], axis=0)
+                    if len(rows) == len(values) else np.zeros(self.words, dtype=np.uint64)
+                )
+            else:
+                bitmap = (
+                    np.bitwise_or.reduce(facet.matrix[rows], axis=0)
+                    if rows else np.zeros(self.words, dtype=np.uint64)
+                )
+            selected.append(bitmap)
+
+        if not selected:
+            return self.live.copy()
+        reduce = np.bitwise_and if combine == "and" else np.bitwise_or
+        return reduce.reduce(selected, axis=0) & self.live
+
+    def counts(self, bitmap, ordinals, fields=None):
+        facets = {}
+        for field in fields or self.fields:
+            facet = self.fields[field]
+            if not facet.values:
+                facets[field] = {}
+                continue
+            counts = facet.counts(bitmap, ordinals)
+            order = np.argsort(-counts, kind="stable")
+            facets[field] = {facet.values[i]: int(counts[i]) for i in order.tolist() if counts[i]}
+        return facets
+
+    def ids(self, ordinals, skip=0, limit=50):
+        return [self.doc_ids[ord_] for ord_ in ordinals[skip:skip + limit].tolist()]
+
+    def values(self, field):
+        return list(self.fields[field].values)
+
+    def document_values(self, doc_id, field):
+        ord_ = self.ords.get(doc_id)
+        if ord_ is None:
+            return None
+        facet = self.fields[field]
+        rows = np.flatnonzero(facet.bitmaps()[:, ord_ >> 6] & np.uint64(1 << (ord_ & 63)))
+        return [facet.values[row] for row in rows.tolist()]
+
+
+class FacetIndex:
+    def __init__(self, fields=FACET_FIELDS):
+        self.field_names = fields
+        self.index = BitmapIndex(fields)
+        self.ready = False
+        self._pending = None
+        self._rebuild_lock = asyncio.Lock()
+        self._generation = 0
+
+    def add(self, doc_id, doc):
+        self.index.add(doc_id, doc)
+        if self._pending is not None:
+            self._pending.append((doc_id, doc))
+
+    def add_many(self, docs):
+        self.index.add_many(docs)
+        if self._pending is not None:
+            self._pending.extend(docs)
+
+    def remove(self, doc_id):
+        self.index.remove(doc_id)
+        if self._pending is not None:
+            self._pending.append((doc_id, None))
+
+    def search(self, filters, modes=None, combine="and", facets=None, skip=0, limit=50):
+        index = self.index
+        bitmap = index.select(filters, modes, combine)
+        ordinals = bit_positions(bitmap)
+        return len(ordinals), index.ids(ordinals, skip, limit), index.counts(bitmap, ordinals, facets)
+
+    def values(self, field):
+        return self.index.values(field)
+
+    def document_values(self, doc_id, field):
+        # None when the document isn't indexed, [] when it has no value for the field
+        return self.index.document_values(doc_id, field)
+
+    async def rebuild(self, collection, batch_size=5000):
+        async with self._rebuild_lock:
+            await self._rebuild(collection, batch_size)
+
+    async def _rebuild(self, collection, batch_size):
+        generation = self._generation
+        # writes made while the cursor is running are replayed onto the new index
+        self._pending = []
+        try:
+            fresh = await self.build(collection, batch_size)
+            if generation != self._generation:
+                # an index built from a swapped-in corpus was installed meanwhile
+                return
+            for doc_id, doc in self._pending:
+                if doc is None:
+                    fresh.remove(doc_id)
+                else:
+                    fresh.add(doc_id, doc)
+            self.install(fresh)
+        finally:
+            self._pending = None
+
+    async def build(self, collection, batch_size=5000):
+        # a new index over collection, e.g. a shadow corpus, left for the caller to install()
+        fresh = BitmapIndex(self.field_names)
+        projection = {field: 1 for field in self.field_names}
+        cursor = collection.find({}, projection).batch_size(batch_size)
+        batch = []
+        async for doc in cursor:
+            batch.append((str(doc["_id"]), doc))
+            if len(batch) >= batch_size:
+                await asyncio.to_thread(fresh.add_many, batch)
+                batch = []
+        if batch:
+            await asyncio.to_thread(fresh.add_many, batch)
+        return fresh
+
+    def install(self, fresh):
+        self.index = fresh
+        self.ready = True
+        self._generation += 1
+        print(f"Facet index built: {len(fresh)} documents, " + ", ".join(
+            f"{len(facet.values)} {field} values" for field, facet in fresh.fields.items()
+        ))
@@ -0,0 +1,35 @@
+import gc
+import os
+import sys
+
+# gunicorn -c gunicorn.conf.py app:app
+#
+# The app is imported once in the master and the topic model, encoder and vector
+# index are loaded there before forking, so workers share those pages copy-on-write
+# instead of each holding a copy. Workers keep their in-memory indexes in step
+# through the worker_events collection (WORKER_SYNC), and a worker that finishes
+# a generate/merge/vector build sends the master a HUP so it reloads the models
+# and forks fresh workers that share them.
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "60"))
+
+os.environ.setdefault("WORKER_SYNC", "1" if workers > 1 else "0")
+
+
+def when_ready(server):
+    sys.modules["app"].preload_shared_state()
+
+
+def on_reload(server):
+    # preload_app keeps the imported module, only the models are swapped
+    sys.modules["app"].preload_shared_state()
+
+
+def pre_fork(server, worker):
+    # moved out of the collector's reach, a gc pass in a worker no longer writes
+    # to (and so copies) every page of objects inherited from the master
+    gc.freeze()
@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+
+class IncrementalAssigner:
+    def __init__(self, batch_size=64, max_wait_seconds=2.0):
+        self.batch_size = batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.queue = asyncio.Queue()
+        self.processed = 0
+        self._stopping = False
+        self._task = None
+
+    def start(self, handler):
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._task = asyncio.create_task(self._run(handler))
+
+    async def stop(self):
+        if self._task is not None:
+            # wait_for can swallow a cancel when the queue get finishes at the
+            # same moment, the flag still ends the loop after the current batch
+            self._stopping = True
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def submit(self, doc):
+        self.queue.put_nowait(doc)
+
+    async def _next_batch(self):
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.max_wait_seconds
+        while len(batch) < self.batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self, handler):
+        while not self._stopping:
+            batch = await self._next_batch()
+            try:
+                await handler(batch)
+                self.processed += len(batch)
+            except Exception as e:
+                print(f"Error assigning topics to {len(batch)} new documents: {str(e)}")
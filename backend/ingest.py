@@ -0,0 +1,164 @@
+import asyncio
+import importlib.util
+import time
+from datetime import datetime
+
+
+# pandas and pyarrow are imported on first ingest, not when the app starts
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+
+CSV_COLUMNS = ['id', 'title', 'story', 'genre']
+TEXT_COLUMNS = ['title', 'story', 'genre']
+
+
+def iter_csv_chunks(csv_path, chunk_size=10000, usecols=CSV_COLUMNS):
+    if PYARROW_AVAILABLE:
+        import pyarrow.csv as pa_csv
+
+        reader = pa_csv.open_csv(
+            csv_path,
+            read_options=pa_csv.ReadOptions(block_size=16 << 20),
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            convert_options=pa_csv.ConvertOptions(include_columns=usecols),
+        )
+        for batch in reader:
+            frame = batch.to_pandas()
+            for start in range(0, len(frame), chunk_size):
+                yield frame.iloc[start:start + chunk_size]
+    else:
+        import pandas as pd
+
+        yield from pd.read_csv(csv_path, usecols=usecols, chunksize=chunk_size)
+
+
+def read_csv_column(csv_path, column, chunk_size=10000):
+    values = []
+    for chunk in iter_csv_chunks(csv_path, chunk_size, usecols=[column]):
+        values.extend(chunk[column].fillna('').tolist())
+    return values
+
+
+def build_documents(chunk, topics=None, topic_names=None):
+    import pandas as pd
+
+    n = len(chunk)
+    text = chunk[TEXT_COLUMNS].fillna('')
+
+    if topics is None:
+        topics_col = [[] for _ in range(n)]
+        names_col = [[] for _ in range(n)]
+    else:
+        topic_names = topic_names or {}
+        topics_col = [[t] if t != -1 else [] for t in topics]
+        names_col = [list(topic_names.get(t, [])) for t in topics]
+
+    frame = pd.DataFrame({
+        "story_id": chunk['id'].astype('int64').to_numpy(),
+        "title": text['title'].astype(str).to_numpy(),
+        "content": text['story'].astype(str).to_numpy(),
+        "genre": text['genre'].astype(str).to_numpy(),
+        "topics": topics_col,
+        "topic_names": names_col,
+        "authors": [[] for _ in range(n)],
+        "year": pd.Series([None] * n, dtype=object),
+        "doi": pd.Series([None] * n, dtype=object),
+        "date_added": pd.Series([datetime.utcnow()] * n, dtype=object),
+        "popularity": 0,
+    })
+    return frame.to_dict('records')
+
+
+class IngestStats:
+    def __init__(self):
+        self.rows = 0
+        self.batches = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        elapsed = self.elapsed
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def to_dict(self):
+        return {
+            "rows": self.rows,
+            "batches": self.batches,
+            "seconds": round(self.elapsed, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+class BulkInserter:
+    def __init__(self, collection, batch_size=1000, max_in_flight=4, stats=None):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.stats = stats or IngestStats()
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._pending = set()
+        self._error = None
+
+    async def add(self, documents):
+        for start in range(0, len(documents), self.batch_size):
+            batch = documents[start:start + self.batch_size]
+            # backpressure: wait for a free slot before queueing another batch
+            await self._slots.acquire()
+            self._raise_if_failed()
+            task = asyncio.create_task(self._insert(batch))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    async def flush(self):
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        self._raise_if_failed()
+        return self.stats
+
+    async def _insert(self, batch):
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+            self.stats.rows += len(batch)
+            self.stats.batches += 1
+        except Exception as e:
+            self._error = self._error or e
+        finally:
+            self._slots.release()
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            raise self._error
+
+
+async def stream_csv_to_collection(
+    collection,
+    csv_path,
+    chunk_size=10000,
+    batch_size=1000,
+    max_in_flight=4,
+    topics=None,
+    topic_names=None,
+):
+    inserter = BulkInserter(collection, batch_size=batch_size, max_in_flight=max_in_flight)
+    chunks = iter_csv_chunks(csv_path, chunk_size)
+    offset = 0
+
+    while True:
+        # parsing is blocking, keep it off the event loop
+        chunk = await asyncio.to_thread(next, chunks, None)
+        if chunk is None:
+            break
+
+        chunk_topics = topics[offset:offset + len(chunk)] if topics is not None else None
+        documents = build_documents(chunk, chunk_topics, topic_names)
+        offset += len(chunk)
+
+        await inserter.add(documents)
+        print(f"Ingested {offset} rows ({inserter.stats.rows_per_second:.0f} rows/s)")
+
+    stats = await inserter.flush()
+    print(f"Ingest finished: {stats.rows} rows in {stats.elapsed:.1f}s ({stats.rows_per_second:.0f} rows/s)")
+    return stats
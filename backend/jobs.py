@@ -0,0 +1,153 @@
+import asyncio
+import multiprocessing
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATES = {JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED}
+
+
+class Job:
+    def __init__(self, kind):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = JOB_QUEUED
+        self.stage = JOB_QUEUED
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self.cancellable = True
+        self.task = None
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    def set_stage(self, stage, progress):
+        self.stage = stage
+        self.progress = progress
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 3),
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    def __init__(self, max_workers=1, max_history=50):
+        self.max_workers = max_workers
+        self.max_history = max_history
+        self.jobs = {}
+        self._executor = None
+        # calls wait here rather than in the pool's queue, so killing the pool on a
+        # cancel never takes another job's queued call down with it
+        self._slots = asyncio.Semaphore(max_workers)
+
+    def start(self):
+        if self._executor is None:
+            # spawn keeps torch/CUDA state and the Mongo client out of the workers
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+    def shutdown(self):
+        for job in self.jobs.values():
+            if job.task and not job.task.done():
+                job.task.cancel()
+        if self._executor is not None:
+            self._kill(self._executor)
+
+    async def run_in_process(self, fn, *args):
+        async with self._slots:
+            self.start()
+            executor = self._executor
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(executor, fn, *args)
+            except asyncio.CancelledError:
+                # the pool would carry on with the orphaned call and every later job
+                # would queue behind it, so the worker process goes with the job
+                self._kill(executor)
+                raise
+
+    def _kill(self, executor):
+        if self._executor is executor:
+            self._executor = None
+        processes = list((executor._processes or {}).values())
+        for process in processes:
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.join(timeout=5)
+
+    def active(self, kind):
+        for job in self.jobs.values():
+            if job.kind == kind and not job.finished:
+                return job
+        return None
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list(self):
+        return sorted(self.jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def submit(self, kind, runner):
+        job = Job(kind)
+        self.jobs[job.job_id] = job
+        self._prune()
+        job.task = asyncio.create_task(self._run(job, runner))
+        return job
+
+    async def cancel(self, job_id, timeout=5):
+        job = self.jobs.get(job_id)
+        if job is None or job.finished or not job.cancellable:
+            return job
+        # a fit already running in the pool is killed with its worker process,
+        # nothing has been written to the database by then
+        job.task.cancel()
+        await asyncio.wait([job.task], timeout=timeout)
+        return job
+
+    async def _run(self, job, runner):
+        job.status = JOB_RUNNING
+        job.started_at = datetime.utcnow()
+        try:
+            job.result = await runner(job)
+            job.status = JOB_COMPLETED
+            job.set_stage(JOB_COMPLETED, 1.0)
+        except asyncio.CancelledError:
+            job.status = JOB_CANCELLED
+            job.stage = JOB_CANCELLED
+        except Exception as e:
+            job.status = JOB_FAILED
+            job.stage = JOB_FAILED
+            job.error = str(e)
+            print(f"Job {job.job_id} ({job.kind}) failed: {str(e)}")
+        finally:
+            job.finished_at = datetime.utcnow()
+
+    def _prune(self):
+        finished = [job for job in self.list() if job.finished]
+        for job in finished[self.max_history:]:
+            del self.jobs[job.job_id]
@@ -0,0 +1,76 @@
+import heapq
+import os
+import re
+from collections import Counter
+from operator import itemgetter
+
+
+DEFAULT_STOP_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+    'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were', 'be',
+    'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would',
+    'should', 'could', 'may', 'might', 'can', 'this', 'that', 'these',
+    'those', 'it', 'its', 'they', 'them', 'their', 'he', 'she', 'him',
+    'her', 'his', 'i', 'you', 'we', 'us', 'my', 'your', 'our'
+})
+
+MIN_WORD_LENGTH = 4
+
+_NON_ALPHA = re.compile(r'[^a-zA-Z\s]')
+# same characters as _NON_ALPHA, for the bytes.translate fast path on ASCII text
+_ASCII_NON_ALPHA = bytes(c for c in range(128) if not (chr(c).isalpha() or chr(c).isspace()))
+
+
+def _stop_words_from_env():
+    extra = os.getenv("EXTRA_STOP_WORDS", "")
+    return DEFAULT_STOP_WORDS | {w.strip().lower() for w in extra.split(",") if w.strip()}
+
+
+STOP_WORDS = _stop_words_from_env()
+
+
+def configure_stop_words(extra=(), replace=None):
+    # only affects this process, pool workers read EXTRA_STOP_WORDS on import
+    global STOP_WORDS
+    base = frozenset(w.lower() for w in replace) if replace is not None else DEFAULT_STOP_WORDS
+    STOP_WORDS = base | {w.lower() for w in extra}
+    return STOP_WORDS
+
+
+def preprocess(text):
+    text = text.lower()
+    if text.isascii():
+        return text.encode('ascii').translate(None, _ASCII_NON_ALPHA).decode('ascii')
+    return _NON_ALPHA.sub('', text)
+
+
+def tokenize(text):
+    stop_words = STOP_WORDS
+    return [
+        word for word in preprocess(text).split()
+        if len(word) >= MIN_WORD_LENGTH and word not in stop_words
+    ]
+
+
+def search_tokenize(text):
+    # same normalization as tokenize, but short terms (EEG, MRI, war) stay searchable;
+    # the length filter only exists to keep them out of keyword lists
+    stop_words = STOP_WORDS
+    return [word for word in preprocess(text).split() if word not in stop_words]
+
+
+def extract_keywords(text, num_keywords=5):
+    stop_words = STOP_WORDS
+    # count every word in C first, then filter the (far fewer) distinct words;
+    # Counter keeps first-occurrence order so ties resolve like most_common()
+    counts = Counter(preprocess(text).split())
+    candidates = [
+        (word, count) for word, count in counts.items()
+        if len(word) >= MIN_WORD_LENGTH and word not in stop_words
+    ]
+    return [word for word, _ in heapq.nlargest(num_keywords, candidates, key=itemgetter(1))]
+
+
+def extract_keywords_batch(texts, num_keywords=5):
+    extract = extract_keywords
+    return [extract(text or '', num_keywords) for text in texts]
@@ -0,0 +1,233 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from pymongo import monitoring
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+_lock = threading.Lock()
+_metrics = []
+_current = contextvars.ContextVar("request_trace", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        _metrics.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        for key, value in sorted(self._values.items()):
+            yield self.name + _format_labels(self.labelnames, key), value
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.value = None
+        _metrics.append(self)
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self):
+        if self.value is not None:
+            yield self.name, self.value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._values = {}
+        _metrics.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with _lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][bisect.bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [("le", _format_number(bound))])
+                yield self.name + "_bucket" + labels, cumulative
+            yield self.name + "_sum" + _format_labels(self.labelnames, key), total
+            yield self.name + "_count" + _format_labels(self.labelnames, key), count
+
+
+REQUEST_SECONDS = Histogram(
+    "neurodoc_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+)
+REQUESTS = Counter(
+    "neurodoc_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+REQUEST_DB_ROUND_TRIPS = Histogram(
+    "neurodoc_request_db_round_trips", "MongoDB commands issued per HTTP request", ("method", "route"), COUNT_BUCKETS
+)
+MONGO_SECONDS = Histogram(
+    "neurodoc_mongo_command_duration_seconds", "MongoDB command latency by command", ("command",)
+)
+MONGO_FAILURES = Counter(
+    "neurodoc_mongo_command_failures_total", "Failed MongoDB commands by command", ("command",)
+)
+SPAN_SECONDS = Histogram(
+    "neurodoc_span_duration_seconds", "Time spent in instrumented code paths", ("span",)
+)
+IMPORT_SECONDS = Gauge(
+    "neurodoc_import_seconds", "Time to import the application module"
+)
+STARTUP_SECONDS = Gauge(
+    "neurodoc_startup_seconds", "Time spent in the startup hook before serving traffic"
+)
+READY_SECONDS = Gauge(
+    "neurodoc_ready_seconds", "Time from import until the readiness checks passed"
+)
+FIRST_REQUEST_SECONDS = Gauge(
+    "neurodoc_first_request_seconds", "Time from import until the first request was served"
+)
+
+
+class RequestTrace:
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        # span name -> [seconds, calls]; Mongo commands are recorded as "mongo.<command>"
+        self.spans = {}
+        self.db_round_trips = 0
+
+    def add(self, name, seconds):
+        entry = self.spans.get(name)
+        if entry is None:
+            self.spans[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def breakdown(self):
+        return ", ".join(
+            f"{name} {seconds * 1000:.1f} ms" + (f" x{calls}" if calls > 1 else "")
+            for name, (seconds, calls) in sorted(self.spans.items(), key=lambda item: -item[1][0])
+        )
+
+
+def start_trace(method, path):
+    trace = RequestTrace(method, path)
+    return trace, _current.set(trace)
+
+
+def end_trace(token):
+    _current.reset(token)
+
+
+def record_span(name, seconds):
+    SPAN_SECONDS.observe(seconds, span=name)
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+@contextmanager
+def span(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - started)
+
+
+@contextmanager
+def stage(timings, name):
+    # for process-pool workers: timings travel back with the result and are
+    # recorded by the parent through record_span
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+
+
+def record_stages(prefix, timings):
+    for name, seconds in (timings or {}).items():
+        record_span(f"{prefix}.{name}", seconds)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    # Motor copies the caller's context into its executor threads, so the
+    # request trace is visible here
+    def started(self, event):
+        trace = _current.get()
+        if trace is not None:
+            trace.db_round_trips += 1
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        MONGO_FAILURES.inc(command=event.command_name)
+        self._record(event)
+
+    def _record(self, event):
+        seconds = event.duration_micros / 1_000_000
+        MONGO_SECONDS.observe(seconds, command=event.command_name)
+        trace = _current.get()
+        if trace is not None:
+            trace.add("mongo." + event.command_name, seconds)
+
+
+def render():
+    lines = []
+    with _lock:
+        for metric in _metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name} {_format_number(value)}" for name, value in metric.samples())
+    return "\n".join(lines) + "\n"
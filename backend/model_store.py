@@ -0,0 +1,106 @@
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+LATEST_FILE = "LATEST"
+META_FILE = "meta.json"
+
+
+class ModelStore:
+    def __init__(self, root, embedding_model=DEFAULT_EMBEDDING_MODEL, keep_versions=3):
+        self.root = root
+        self.embedding_model = embedding_model
+        self.keep_versions = keep_versions
+
+    def version_path(self, version):
+        return os.path.join(self.root, version)
+
+    def latest_version(self):
+        try:
+            with open(os.path.join(self.root, LATEST_FILE)) as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return version if version and os.path.isdir(self.version_path(version)) else None
+
+    def read_meta(self, version):
+        try:
+            with open(os.path.join(self.version_path(version), META_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def save(self, topic_model, extra_meta=None, publish=True):
+        os.makedirs(self.root, exist_ok=True)
+        version = time.strftime("%Y%m%d-%H%M%S") + f"-{int(time.time() * 1000) % 1000:03d}"
+        path = self.version_path(version)
+
+        topic_model.save(
+            path,
+            serialization="safetensors",
+            save_ctfidf=True,
+            save_embedding_model=self.embedding_model,
+        )
+        with open(os.path.join(path, META_FILE), "w") as f:
+            json.dump({
+                "version": version,
+                "embedding_model": self.embedding_model,
+                "saved_at": time.time(),
+                **(extra_meta or {}),
+            }, f)
+
+        if publish:
+            self.publish(version)
+        return version
+
+    def publish(self, version):
+        # readers only ever see a fully written version; fits save unpublished and the
+        # API publishes once the matching topics are in Mongo, so a cancelled or failed
+        # run never becomes the model every process loads
+        tmp = os.path.join(self.root, LATEST_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            f.write(version)
+        os.replace(tmp, os.path.join(self.root, LATEST_FILE))
+        self.prune()
+
+    def load(self, version=None):
+        from bertopic import BERTopic
+
+        version = version or self.latest_version()
+        if version is None:
+            return None, None
+        model = BERTopic.load(self.version_path(version), embedding_model=self.embedding_model)
+        return model, version
+
+    def prune(self):
+        versions = sorted(
+            name for name in os.listdir(self.root)
+            if os.path.isdir(self.version_path(name))
+        )
+        latest = self.latest_version()
+        for version in versions[:-self.keep_versions]:
+            if version != latest:
+                shutil.rmtree(self.version_path(version), ignore_errors=True)
+
+
+def rank_topics(topic_model, text, limit=5):
+    topics, probs = topic_model.transform([text])
+    primary = int(topics[0])
+
+    ranked = []
+    if probs is not None and np.ndim(probs) == 2:
+        topic_ids = sorted(topic_model.get_topics())
+        if probs.shape[1] != len(topic_ids):
+            topic_ids = [t for t in topic_ids if t != -1]
+        if probs.shape[1] == len(topic_ids):
+            order = np.argsort(-probs[0])
+            ranked = [int(topic_ids[i]) for i in order if topic_ids[i] != -1]
+
+    if primary != -1:
+        ranked = [primary] + [t for t in ranked if t != primary]
+    return ranked[:limit]
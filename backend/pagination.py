@@ -0,0 +1,82 @@
+import base64
+
+from bson import json_util
+
+
+SORTABLE_FIELDS = ("date_added", "popularity", "story_id")
+
+
+class CursorError(ValueError):
+    pass
+
+
+def sort_direction(order):
+    return -1 if order == "desc" else 1
+
+
+def sort_spec(field, direction):
+    # _id breaks ties so every document has a unique position in the order
+    return [(field, direction), ("_id", direction)]
+
+
+def encode_cursor(doc, field, direction):
+    payload = json_util.dumps({"f": field, "d": direction, "v": doc.get(field), "id": doc["_id"]})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, field, direction):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        value, last_id = payload["v"], payload["id"]
+    except Exception:
+        raise CursorError("Invalid cursor")
+    if payload.get("f") != field or payload.get("d") != direction:
+        raise CursorError("Cursor does not match sort_by/order")
+    return value, last_id
+
+
+def keyset_filter(base_filter, field, direction, cursor):
+    if not cursor:
+        return base_filter
+    value, last_id = decode_cursor(cursor, field, direction)
+    op = "$lt" if direction == -1 else "$gt"
+    after = {"$or": [
+        {field: {op: value}},
+        {field: value, "_id": {op: last_id}},
+    ]}
+    return {"$and": [base_filter, after]} if base_filter else after
+
+
+def open_page(collection, base_filter, field, direction, cursor, limit, skip=0, projection=None):
+    query = keyset_filter(base_filter, field, direction, cursor)
+    find = collection.find(query, projection).sort(sort_spec(field, direction))
+    if skip and not cursor:
+        # offset paging is still accepted for old clients, cursors ignore it
+        find = find.skip(skip)
+    # one extra row tells us whether there is a next page without counting
+    return find.limit(limit + 1)
+
+
+async def fetch_page(collection, base_filter, field, direction, cursor, limit, skip=0, projection=None):
+    find = open_page(collection, base_filter, field, direction, cursor, limit, skip, projection)
+    documents = await find.to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1], field, direction)
+    return documents, next_cursor
+
+
+async def iter_page(find, field, direction, limit, page):
+    # streams an open_page() cursor, leaving the next cursor in page["next_cursor"]
+    last = None
+    count = 0
+    async for doc in find:
+        if count == limit:
+            page["next_cursor"] = encode_cursor(last, field, direction)
+            break
+        last = doc
+        count += 1
+        yield doc
@@ -0,0 +1,104 @@
+import asyncio
+import math
+import time
+from collections import Counter
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+
+TRENDING_FIELD = "trending"
+# stands in for "no views yet", far below any real log score
+TRENDING_FLOOR = -1e9
+
+
+def trending_increment(views, now, half_life_seconds):
+    # A decayed score S(t) = S0 * exp(-(t - t0) / tau) is stored as L = ln(S) + t / tau.
+    # L doesn't change as time passes, so it can be indexed and compared across documents;
+    # adding n views at time t is logaddexp(L, ln(n) + t / tau).
+    tau = half_life_seconds / math.log(2)
+    return math.log(views) + now / tau
+
+
+def logaddexp_expression(field, value):
+    current = {"$ifNull": ["$" + field, TRENDING_FLOOR]}
+    high = {"$max": [current, value]}
+    low = {"$min": [current, value]}
+    return {"$add": [high, {"$ln": {"$add": [1, {"$exp": {"$subtract": [low, high]}}]}}]}
+
+
+class PopularityTracker:
+    def __init__(self, flush_interval_seconds=10.0, half_life_hours=24.0):
+        self.flush_interval_seconds = flush_interval_seconds
+        # 0 turns time-decayed trending off, only popularity is counted
+        self.half_life_seconds = half_life_hours * 3600
+        self.views = 0
+        self.flushes = 0
+        self.flushed_documents = 0
+        self._hits = Counter()
+        self._task = None
+
+    @property
+    def trending_enabled(self):
+        return self.half_life_seconds > 0
+
+    def hit(self, doc_id):
+        self._hits[doc_id] += 1
+        self.views += 1
+
+    def _operation(self, doc_id, views, now):
+        if not self.trending_enabled:
+            return UpdateOne({"_id": ObjectId(doc_id)}, {"$inc": {"popularity": views}})
+        # an update pipeline keeps the read-modify-write of the decayed score atomic per document
+        increment = trending_increment(views, now, self.half_life_seconds)
+        return UpdateOne({"_id": ObjectId(doc_id)}, [{"$set": {
+            "popularity": {"$add": [{"$ifNull": ["$popularity", 0]}, views]},
+            TRENDING_FIELD: logaddexp_expression(TRENDING_FIELD, increment),
+        }}])
+
+    async def flush(self, collection):
+        if not self._hits:
+            return 0
+        hits, self._hits = self._hits, Counter()
+        now = time.time()
+        operations = [self._operation(doc_id, views, now) for doc_id, views in hits.items()]
+        try:
+            await collection.bulk_write(operations, ordered=False)
+        except Exception:
+            # put the views back so the next flush retries them
+            self._hits.update(hits)
+            raise
+        self.flushes += 1
+        self.flushed_documents += len(operations)
+        return len(operations)
+
+    def start(self, collection):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(collection))
+
+    async def stop(self, collection=None):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if collection is not None:
+            await self.flush(collection)
+
+    async def _run(self, collection):
+        # views are written behind, one bulk_write per interval however hot a document is
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            try:
+                await self.flush(collection)
+            except Exception as e:
+                print(f"Error flushing popularity: {str(e)}")
+
+    def stats(self):
+        return {
+            "views": self.views,
+            "pending_documents": len(self._hits),
+            "flushes": self.flushes,
+            "flushed_documents": self.flushed_documents,
+            "flush_interval_seconds": self.flush_interval_seconds,
+            "trending_half_life_hours": self.half_life_seconds / 3600,
+        }
@@ -0,0 +1,42 @@
+DOCUMENT_FIELDS = (
+    "title", "content", "genre", "topics", "topic_names", "authors", "year",
+    "doi", "date_added", "popularity", "story_id", "pending_merge",
+)
+SUMMARY_FIELDS = (
+    "title", "genre", "topics", "topic_names", "authors", "year",
+    "date_added", "popularity", "story_id",
+)
+SNIPPET_FIELD = "snippet"
+SUMMARY_VIEW = "summary"
+FULL_VIEW = "full"
+
+
+class ProjectionError(ValueError):
+    pass
+
+
+def snippet_expression(length):
+    # computed by mongod, the full content never leaves the server
+    return {"$substrCP": [{"$ifNull": ["$content", ""]}, 0, length]}
+
+
+def build_projection(fields=None, snippet_length=200, required=()):
+    if fields is None or fields == SUMMARY_VIEW:
+        names = list(SUMMARY_FIELDS) + [SNIPPET_FIELD]
+    elif fields == FULL_VIEW:
+        return None
+    else:
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in names if name not in DOCUMENT_FIELDS and name != SNIPPET_FIELD and name != "_id"]
+        if unknown:
+            raise ProjectionError(
+                f"Unknown fields: {', '.join(unknown)}. "
+                f"Use '{SUMMARY_VIEW}', '{FULL_VIEW}' or a list of: {', '.join(DOCUMENT_FIELDS + (SNIPPET_FIELD,))}"
+            )
+
+    projection = {name: 1 for name in names if name != "_id"}
+    for name in required:
+        projection[name] = 1
+    if SNIPPET_FIELD in projection:
+        projection[SNIPPET_FIELD] = snippet_expression(snippet_length)
+    return projection
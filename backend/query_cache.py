@@ -0,0 +1,67 @@
+import time
+from collections import OrderedDict
+
+from events import DOCUMENTS_CREATED, DOCUMENTS_UPDATED, DOCUMENTS_DELETED, TOPICS_CHANGED, CORPUS_RELOADED, VECTORS_BUILT
+
+
+def normalize_query(query):
+    # case and spacing don't change either ranking, so they share an entry
+    return " ".join(query.lower().split())
+
+
+class QueryResultCache:
+    def __init__(self, max_entries=1000, ttl_seconds=60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, depth):
+        # entries hold a ranking down to some depth, deeper pages rank again
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic() or entry[1] < depth:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    def set(self, key, depth, value, generation):
+        if generation != self.generation:
+            # a write landed while this ranking was computed, it may already be stale
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, depth, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.generation += 1
+        self.invalidations += 1
+        self._entries.clear()
+
+    async def on_change(self, event, doc_ids, topic_ids):
+        # any write shifts BM25 statistics and topic names are searchable, so drop everything;
+        # a new vector index changes every semantic and hybrid ranking
+        if event in (DOCUMENTS_CREATED, DOCUMENTS_UPDATED, DOCUMENTS_DELETED, TOPICS_CHANGED, CORPUS_RELOADED, VECTORS_BUILT):
+            self.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "ttl_seconds": self.ttl_seconds,
+        }
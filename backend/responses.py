@@ -0,0 +1,66 @@
+import json
+from datetime import date, datetime
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from metrics import span
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _default(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content):
+    # ObjectId and datetime are encoded on the way out, documents are never copied or mutated
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data):
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content):
+        with span("serialize"):
+            return dumps(content)
+
+
+async def _ndjson_lines(documents, trailer):
+    if hasattr(documents, "__aiter__"):
+        async for doc in documents:
+            yield dumps(doc) + b"\n"
+    else:
+        for doc in documents:
+            yield dumps(doc) + b"\n"
+    if trailer is not None:
+        yield dumps(trailer()) + b"\n"
+
+
+def ndjson_response(documents, trailer=None, headers=None):
+    # one document per line as it comes off the cursor, the optional trailer
+    # line carries paging state that is only known once the page is consumed
+    return StreamingResponse(_ndjson_lines(documents, trailer), media_type=NDJSON_MEDIA_TYPE, headers=headers)
+
+
+def wants_ndjson(request, format=None):
+    if format is not None:
+        return format == "ndjson"
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
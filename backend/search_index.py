@@ -0,0 +1,241 @@
+import asyncio
+import heapq
+import math
+from array import array
+from collections import Counter
+
+
+SEARCH_FIELDS = ("title", "content", "genre", "topic_names")
+
+
+def document_text(doc):
+    parts = []
+    for field in SEARCH_FIELDS:
+        value = doc.get(field)
+        if isinstance(value, list):
+            parts.extend(str(v) for v in value)
+        elif value:
+            parts.append(str(value))
+    return " ".join(parts)
+
+
+def fuse_rankings(rankings, k=60):
+    # reciprocal-rank fusion: only ranks matter, so BM25 and cosine scores need no calibration
+    fused = {}
+    for ranking in rankings:
+        for rank, (doc_id, _) in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: -item[1])
+
+
+class InvertedIndex:
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        # term -> (doc ordinals, term frequencies), both append-only arrays
+        self.postings = {}
+        self.doc_ids = []
+        self.doc_lengths = array('I')
+        self.ords = {}
+        self.total_length = 0
+        self.deleted = 0
+
+    def __len__(self):
+        return len(self.ords)
+
+    def add(self, doc_id, tokens, counts=None):
+        if doc_id in self.ords:
+            self.remove(doc_id)
+
+        ord_ = len(self.doc_ids)
+        self.doc_ids.append(doc_id)
+        self.doc_lengths.append(len(tokens))
+        self.ords[doc_id] = ord_
+        self.total_length += len(tokens)
+
+        for term, tf in (Counter(tokens) if counts is None else counts).items():
+            entry = self.postings.get(term)
+            if entry is None:
+                entry = self.postings[term] = (array('I'), array('I'))
+            entry[0].append(ord_)
+            entry[1].append(tf)
+
+    def remove(self, doc_id):
+        ord_ = self.ords.pop(doc_id, None)
+        if ord_ is None:
+            return False
+        # postings are cleaned lazily by compact()
+        self.doc_ids[ord_] = None
+        self.total_length -= self.doc_lengths[ord_]
+        self.deleted += 1
+        if self.deleted > 1000 and self.deleted > len(self.ords):
+            self.compact()
+        return True
+
+    def compact(self):
+        remap = {}
+        doc_ids = []
+        doc_lengths = array('I')
+        for old_ord, doc_id in enumerate(self.doc_ids):
+            if doc_id is None:
+                continue
+            remap[old_ord] = len(doc_ids)
+            doc_ids.append(doc_id)
+            doc_lengths.append(self.doc_lengths[old_ord])
+
+        postings = {}
+        for term, (ords, tfs) in self.postings.items():
+            new_ords = array('I')
+            new_tfs = array('I')
+            for ord_, tf in zip(ords, tfs):
+                new_ord = remap.get(ord_)
+                if new_ord is not None:
+                    new_ords.append(new_ord)
+                    new_tfs.append(tf)
+            if new_ords:
+                postings[term] = (new_ords, new_tfs)
+
+        self.postings = postings
+        self.doc_ids = doc_ids
+        self.doc_lengths = doc_lengths
+        self.ords = {doc_id: ord_ for ord_, doc_id in enumerate(doc_ids)}
+        self.deleted = 0
+
+    def search(self, terms, skip=0, limit=50):
+        n_docs = len(self.ords)
+        if not n_docs or not terms:
+            return 0, []
+
+        avg_length = self.total_length / n_docs or 1.0
+        k1 = self.k1
+        b = self.b
+        doc_ids = self.doc_ids
+        doc_lengths = self.doc_lengths
+        scores = {}
+
+        for term in set(terms):
+            entry = self.postings.get(term)
+            if entry is None:
+                continue
+            ords, tfs = entry
+            df = len(ords)
+            idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            for ord_, tf in zip(ords, tfs):
+                if doc_ids[ord_] is None:
+                    continue
+                norm = k1 * (1.0 - b + b * doc_lengths[ord_] / avg_length)
+                scores[ord_] = scores.get(ord_, 0.0) + idf * tf * (k1 + 1.0) / (tf + norm)
+
+        top = heapq.nlargest(skip + limit, scores.items(), key=lambda item: item[1])
+        return len(scores), [(doc_ids[ord_], score) for ord_, score in top[skip:]]
+
+
+class SearchIndex:
+    def __init__(self, tokenizer, k1=1.2, b=0.75):
+        self.tokenizer = tokenizer
+        self.k1 = k1
+        self.b = b
+        self.index = InvertedIndex(k1, b)
+        self.ready = False
+        self._pending = None
+        self._rebuild_lock = asyncio.Lock()
+        self._generation = 0
+        # doc_id -> the add_many chunk still tokenizing it; a direct add or remove
+        # in the meantime is newer and drops the claim
+        self._claims = {}
+
+    def add(self, doc_id, doc):
+        self._claims.pop(doc_id, None)
+        tokens = self.tokenizer(document_text(doc))
+        self.index.add(doc_id, tokens)
+        if self._pending is not None:
+            self._pending.append((doc_id, tokens))
+
+    def remove(self, doc_id):
+        self._claims.pop(doc_id, None)
+        self.index.remove(doc_id)
+        if self._pending is not None:
+            self._pending.append((doc_id, None))
+
+    async def add_many(self, docs, chunk_size=2000):
+        # bulk writes: tokenizing and term counting run off the event loop, only the
+        # posting appends happen on it, a chunk at a time
+        for start in range(0, len(docs), chunk_size):
+            chunk = docs[start:start + chunk_size]
+            claim = object()
+            for doc_id, _ in chunk:
+                self._claims[doc_id] = claim
+            try:
+                counted = await asyncio.to_thread(self._count_terms, chunk)
+                index = self.index
+                for doc_id, tokens, counts in counted:
+                    if self._claims.get(doc_id) is not claim:
+                        continue
+                    index.add(doc_id, tokens, counts)
+                    if self._pending is not None:
+                        self._pending.append((doc_id, tokens))
+            finally:
+                for doc_id, _ in chunk:
+                    if self._claims.get(doc_id) is claim:
+                        del self._claims[doc_id]
+
+    def _count_terms(self, docs):
+        counted = []
+        for doc_id, doc in docs:
+            tokens = self.tokenizer(document_text(doc))
+            counted.append((doc_id, tokens, Counter(tokens)))
+        return counted
+
+    def search(self, query, skip=0, limit=50):
+        return self.index.search(self.tokenizer(query), skip, limit)
+
+    async def rebuild(self, collection, batch_size=2000):
+        async with self._rebuild_lock:
+            await self._rebuild(collection, batch_size)
+
+    async def _rebuild(self, collection, batch_size):
+        generation = self._generation
+        # writes made while the cursor is running are replayed onto the new index
+        self._pending = []
+        try:
+            fresh = await self.build(collection, batch_size)
+            if generation != self._generation:
+                # an index built from a swapped-in corpus was installed meanwhile
+                return
+            for doc_id, tokens in self._pending:
+                if tokens is None:
+                    fresh.remove(doc_id)
+                else:
+                    fresh.add(doc_id, tokens)
+            self.install(fresh)
+        finally:
+            self._pending = None
+
+    async def build(self, collection, batch_size=2000):
+        # a new index over collection, e.g. a shadow corpus, left for the caller to install()
+        fresh = InvertedIndex(self.k1, self.b)
+        projection = {field: 1 for field in SEARCH_FIELDS}
+        cursor = collection.find({}, projection).batch_size(batch_size)
+        batch = []
+        async for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                await self._index_batch(fresh, batch)
+                batch = []
+        if batch:
+            await self._index_batch(fresh, batch)
+        return fresh
+
+    def install(self, fresh):
+        self.index = fresh
+        self.ready = True
+        self._generation += 1
+        print(f"Search index built: {len(fresh)} documents, {len(fresh.postings)} terms")
+
+    async def _index_batch(self, index, docs):
+        # tokenizing is CPU bound, keep it off the event loop
+        tokenized = await asyncio.to_thread(
+            lambda: [(str(doc["_id"]), self.tokenizer(document_text(doc))) for doc in docs]
+        )
+        for doc_id, tokens in tokenized:
+            index.add(doc_id, tokens)
@@ -0,0 +1,51 @@
+import asyncio
+import time
+
+from cache import MemoryCacheBackend, ReadCache
+
+
+def loader():
+    calls = []
+
+    async def load():
+        calls.append(None)
+        return {"n": len(calls)}
+
+    return load
+
+
+def test_invalidate_bumps_tag_versions():
+    cache = ReadCache(MemoryCacheBackend(), ttl_seconds=30)
+    load = loader()
+
+    async def run():
+        first = await cache.fetch("page", ["document:a"], load)
+        assert await cache.fetch("page", ["document:a"], load) == first
+        await cache.invalidate("document:b")
+        assert await cache.fetch("page", ["document:a"], load) == first
+        await cache.invalidate("document:a")
+        return first, await cache.fetch("page", ["document:a"], load)
+
+    first, second = asyncio.run(run())
+    assert first[1] == b'{"n":1}'
+    assert second[1] == b'{"n":2}'
+
+
+def test_tag_versions_expire_and_never_repeat(monkeypatch):
+    backend = MemoryCacheBackend()
+    now = [time.monotonic()]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+
+    async def run():
+        await backend.bump([f"document:{i}" for i in range(100)], 10)
+        assert backend.stats()["tags"] == 100
+        seen = await backend.tag_versions(["document:0", "document:99"])
+        now[0] += 11
+        await backend.bump(["document:0"], 10)
+        return seen, await backend.tag_versions(["document:0", "document:1"])
+
+    seen, after = asyncio.run(run())
+    assert backend.stats()["tags"] == 1
+    # an expired tag reads as 0 again, a bumped one gets a version it never had
+    assert after[1] == 0
+    assert after[0] not in seen and after[0] != 0
@@ -0,0 +1,131 @@
+import numpy as np
+
+from facets import BitmapIndex, FacetIndex, bit_positions
+
+
+DOCS = [
+    ("a", {"genre": "Memoir", "topics": [1, 2], "year": 2020}),
+    ("b", {"genre": "Essay", "topics": [2], "year": 2021}),
+    ("c", {"genre": "Memoir", "topics": [3], "year": 2021}),
+    ("d", {"genre": "Poetry", "topics": [], "year": None}),
+]
+
+
+def ids(index, bitmap):
+    return index.ids(bit_positions(bitmap), limit=len(index.doc_ids))
+
+
+def build(docs=DOCS, words=1024):
+    index = BitmapIndex(words=words)
+    index.add_many(docs)
+    return index
+
+
+def test_add_many_matches_add():
+    bulk = build()
+    single = BitmapIndex()
+    for doc_id, doc in DOCS:
+        single.add(doc_id, doc)
+    assert bulk.doc_ids == single.doc_ids
+    assert np.array_equal(bulk.live, single.live)
+    for field in bulk.fields:
+        assert bulk.values(field) == single.values(field)
+        assert np.array_equal(bulk.fields[field].bitmaps(), single.fields[field].bitmaps())
+    assert bulk.document_values("a", "topics") == [1, 2]
+    assert bulk.document_values("d", "topics") == []
+    assert bulk.document_values("missing", "topics") is None
+
+
+def test_select_any_all_and_or():
+    index = build()
+    assert ids(index, index.select({})) == ["a", "b", "c", "d"]
+    assert ids(index, index.select({"genre": ["Memoir"]})) == ["a", "c"]
+    assert ids(index, index.select({"topics": [1, 3]})) == ["a", "c"]
+    assert ids(index, index.select({"topics": [1, 2]}, {"topics": "all"})) == ["a"]
+    # a value nobody has can never be matched by every member
+    assert ids(index, index.select({"topics": [2, 99]}, {"topics": "all"})) == []
+    assert ids(index, index.select({"genre": ["Unknown"]})) == []
+    assert ids(index, index.select({"genre": ["Memoir"], "year": [2021]})) == ["c"]
+    assert ids(index, index.select({"genre": ["Poetry"], "year": [2020]}, combine="or")) == ["a", "d"]
+
+
+def test_counts_for_single_and_multi_valued_fields():
+    index = build()
+    bitmap = index.select({"year": [2021, 2020]})
+    counts = index.counts(bitmap, bit_positions(bitmap))
+    assert counts["genre"] == {"Memoir": 2, "Essay": 1}
+    assert counts["topics"] == {2: 2, 1: 1, 3: 1}
+    assert counts["year"] == {2021: 2, 2020: 1}
+    assert list(index.counts(bitmap, bit_positions(bitmap), ["genre"])) == ["genre"]
+
+
+def test_add_replaces_only_fields_present():
+    index = build()
+    index.add("a", {"topics": [3]})
+    assert index.document_values("a", "topics") == [3]
+    assert index.document_values("a", "genre") == ["Memoir"]
+    assert ids(index, index.select({"topics": [1]})) == []
+    index.add("a", {"genre": "Essay"})
+    bitmap = index.select({})
+    assert index.counts(bitmap, bit_positions(bitmap), ["genre"])["genre"] == {"Essay": 2, "Memoir": 1, "Poetry": 1}
+
+
+def test_remove_clears_document_from_every_field():
+    index = build()
+    assert index.remove("a")
+    assert not index.remove("a")
+    assert len(index) == 3
+    assert index.doc_ids[0] is None
+    assert ids(index, index.select({})) == ["b", "c", "d"]
+    assert ids(index, index.select({"topics": [1, 2]})) == ["b"]
+    bitmap = index.select({})
+    assert index.counts(bitmap, bit_positions(bitmap))["genre"] == {"Memoir": 1, "Essay": 1, "Poetry": 1}
+
+
+def test_compact_renumbers_survivors():
+    index = build()
+    index.remove("a")
+    index.remove("c")
+    index.compact()
+    assert index.doc_ids == ["b", "d"]
+    assert index.ords == {"b": 0, "d": 1}
+    assert index.deleted == 0
+    assert ids(index, index.select({"topics": [2]})) == ["b"]
+    assert ids(index, index.select({"genre": ["Poetry"]})) == ["d"]
+    assert index.document_values("b", "year") == [2021]
+    bitmap = index.select({})
+    assert index.counts(bitmap, bit_positions(bitmap))["genre"] == {"Essay": 1, "Poetry": 1}
+    index.add("e", {"genre": "Essay", "topics": [2]})
+    assert ids(index, index.select({"topics": [2]})) == ["b", "e"]
+
+
+def test_grows_past_initial_capacity():
+    docs = [(str(i), {"genre": "even" if i % 2 == 0 else "odd", "topics": [i % 3]}) for i in range(200)]
+    index = build(docs, words=1)
+    assert index.words >= 4
+    assert index.select({"genre": ["odd"]}).dtype == np.uint64
+    assert len(bit_positions(index.select({"genre": ["odd"], "topics": [0]}))) == 33
+    index.add("200", {"genre": "odd", "topics": [0]})
+    assert len(bit_positions(index.select({"genre": ["odd"], "topics": [0]}))) == 34
+
+
+def test_facet_index_search():
+    facet_index = FacetIndex()
+    for doc_id, doc in DOCS:
+        facet_index.add(doc_id, doc)
+    total, page, counts = facet_index.search({"genre": ["Memoir", "Essay"]}, facets=["topics"], skip=1, limit=1)
+    assert total == 3
+    assert page == ["b"]
+    assert counts == {"topics": {2: 2, 1: 1, 3: 1}}
+
+
+def test_add_many_replaces_fields_of_indexed_documents():
+    index = build()
+    index.add_many([("a", {"topics": [3]}), ("b", {"genre": "Memoir", "topics": [1]})])
+    assert len(index) == 4
+    assert index.document_values("a", "topics") == [3]
+    assert index.document_values("a", "genre") == ["Memoir"]
+    assert index.document_values("b", "topics") == [1]
+    assert ids(index, index.select({"genre": ["Memoir"]})) == ["a", "b", "c"]
+    assert ids(index, index.select({"genre": ["Essay"]})) == []
+    assert ids(index, index.select({"topics": [2]})) == []
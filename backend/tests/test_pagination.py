@@ -0,0 +1,71 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from pagination import CursorError, decode_cursor, encode_cursor, keyset_filter, sort_direction, sort_spec
+
+
+def test_sort_spec_breaks_ties_on_id():
+    assert sort_direction("desc") == -1
+    assert sort_direction("asc") == 1
+    assert sort_spec("popularity", -1) == [("popularity", -1), ("_id", -1)]
+
+
+@pytest.mark.parametrize("value", [datetime(2024, 5, 1, 12, 30), 42, 3.5, "story-7", None])
+def test_cursor_round_trips_bson_values(value):
+    doc_id = ObjectId()
+    cursor = encode_cursor({"_id": doc_id, "date_added": value}, "date_added", -1)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, "date_added", -1) == (value, doc_id)
+
+
+def test_cursor_of_document_missing_the_field():
+    doc_id = ObjectId()
+    cursor = encode_cursor({"_id": doc_id}, "popularity", 1)
+    assert decode_cursor(cursor, "popularity", 1) == (None, doc_id)
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", "e30", "!!!!"])
+def test_decode_rejects_malformed_cursors(cursor):
+    with pytest.raises(CursorError, match="Invalid cursor"):
+        decode_cursor(cursor, "popularity", -1)
+
+
+@pytest.mark.parametrize("field, direction", [("date_added", -1), ("popularity", 1)])
+def test_decode_rejects_cursor_for_another_sort(field, direction):
+    cursor = encode_cursor({"_id": ObjectId(), "popularity": 3}, "popularity", -1)
+    with pytest.raises(CursorError, match="does not match"):
+        decode_cursor(cursor, field, direction)
+
+
+def test_keyset_filter_without_cursor_returns_base_filter():
+    base = {"genre": "Memoir"}
+    assert keyset_filter(base, "popularity", -1, None) is base
+    assert keyset_filter({}, "popularity", -1, "") == {}
+
+
+def test_keyset_filter_descending():
+    doc_id = ObjectId()
+    cursor = encode_cursor({"_id": doc_id, "popularity": 7}, "popularity", -1)
+    assert keyset_filter({}, "popularity", -1, cursor) == {"$or": [
+        {"popularity": {"$lt": 7}},
+        {"popularity": 7, "_id": {"$lt": doc_id}},
+    ]}
+
+
+def test_keyset_filter_ascending_combines_with_base_filter():
+    doc_id = ObjectId()
+    cursor = encode_cursor({"_id": doc_id, "story_id": 12}, "story_id", 1)
+    assert keyset_filter({"topics": 3}, "story_id", 1, cursor) == {"$and": [
+        {"topics": 3},
+        {"$or": [
+            {"story_id": {"$gt": 12}},
+            {"story_id": 12, "_id": {"$gt": doc_id}},
+        ]},
+    ]}
+
+
+def test_keyset_filter_rejects_bad_cursor():
+    with pytest.raises(CursorError):
+        keyset_filter({}, "popularity", -1, "garbage")
@@ -0,0 +1,169 @@
+import asyncio
+import threading
+
+from keywords import search_tokenize
+from search_index import InvertedIndex, SearchIndex
+
+
+def build(docs):
+    index = InvertedIndex()
+    for doc_id, text in docs.items():
+        index.add(doc_id, text.split())
+    return index
+
+
+def ranked_ids(index, terms, skip=0, limit=50):
+    return [doc_id for doc_id, _ in index.search(terms, skip, limit)[1]]
+
+
+def test_search_ranks_by_bm25():
+    index = build({
+        "a": "neuron neuron neuron cortex",
+        "b": "neuron cortex cortex cortex",
+        "c": "memory",
+    })
+    total, results = index.search(["neuron"])
+    assert total == 2
+    assert [doc_id for doc_id, _ in results] == ["a", "b"]
+    assert results[0][1] > results[1][1] > 0
+
+
+def test_search_pages_and_counts_all_matches():
+    index = build({str(i): "signal " * (i + 1) for i in range(5)})
+    total, results = index.search(["signal"], skip=1, limit=2)
+    assert total == 5
+    assert len(results) == 2
+    assert ranked_ids(index, ["signal"], limit=5)[1:3] == [doc_id for doc_id, _ in results]
+
+
+def test_search_without_terms_or_documents():
+    assert InvertedIndex().search(["neuron"]) == (0, [])
+    assert build({"a": "neuron"}).search([]) == (0, [])
+    assert build({"a": "neuron"}).search(["missing"]) == (0, [])
+
+
+def test_re_adding_a_document_replaces_its_postings():
+    index = build({"a": "neuron", "b": "cortex"})
+    index.add("a", ["memory"])
+    assert len(index) == 2
+    assert ranked_ids(index, ["neuron"]) == []
+    assert ranked_ids(index, ["memory"]) == ["a"]
+    assert index.total_length == 2
+
+
+def test_remove_hides_document_before_compaction():
+    index = build({"a": "neuron cortex", "b": "neuron"})
+    assert index.remove("a")
+    assert not index.remove("a")
+    assert len(index) == 1
+    assert index.deleted == 1
+    assert ranked_ids(index, ["neuron"]) == ["b"]
+    assert ranked_ids(index, ["cortex"]) == []
+    assert index.total_length == 1
+
+
+def test_compact_drops_deleted_documents():
+    docs = {str(i): f"term{i % 3} shared" for i in range(10)}
+    index = build(docs)
+    for doc_id in ("0", "3", "4", "9"):
+        index.remove(doc_id)
+        del docs[doc_id]
+    assert index.search(["term0", "shared"], limit=10)[0] == 6
+
+    index.compact()
+
+    assert index.deleted == 0
+    assert None not in index.doc_ids
+    assert index.doc_ids == ["1", "2", "5", "6", "7", "8"]
+    assert index.ords == {doc_id: ord_ for ord_, doc_id in enumerate(index.doc_ids)}
+    assert list(index.doc_lengths) == [2] * 6
+    # postings of fully deleted documents are gone, the rest are remapped
+    assert sorted(index.postings) == ["shared", "term0", "term1", "term2"]
+    assert list(index.postings["term0"][0]) == [index.ords["6"]]
+    # document frequencies no longer count the deleted documents
+    assert index.search(["term0", "shared"], limit=10) == build(docs).search(["term0", "shared"], limit=10)
+
+
+def test_remove_compacts_once_most_documents_are_deleted():
+    index = build({str(i): "neuron" for i in range(2500)})
+    for i in range(1500):
+        index.remove(str(i))
+    # compacted when deletions first outnumbered live documents past 1000
+    assert index.deleted < 1000
+    assert len(index.doc_ids) == len(index) + index.deleted
+    assert index.search(["neuron"], limit=3)[0] == 1000
+
+
+def test_search_index_keeps_short_terms():
+    index = SearchIndex(search_tokenize)
+    index.add("a", {"title": "EEG and MRI of the war veteran", "content": "cortex"})
+    index.add("b", {"title": "Cortex", "genre": "Memoir"})
+    assert [doc_id for doc_id, _ in index.search("eeg")[1]] == ["a"]
+    assert [doc_id for doc_id, _ in index.search("MRI war")[1]] == ["a"]
+    assert [doc_id for doc_id, _ in index.search("memoir")[1]] == ["b"]
+    assert index.search("the and of")[0] == 0
+
+
+def test_search_index_remove():
+    index = SearchIndex(search_tokenize)
+    index.add("a", {"title": "EEG"})
+    index.remove("a")
+    assert index.search("eeg") == (0, [])
+
+
+def test_add_many_matches_add():
+    docs = [(str(i), {"title": f"EEG study {i}", "content": "cortex " * (i + 1)}) for i in range(5)]
+    single = SearchIndex(search_tokenize)
+    for doc_id, doc in docs:
+        single.add(doc_id, doc)
+    bulk = SearchIndex(search_tokenize)
+    asyncio.run(bulk.add_many(docs, chunk_size=2))
+    assert bulk.search("eeg cortex") == single.search("eeg cortex")
+    assert bulk._claims == {}
+
+
+def test_add_many_does_not_overwrite_newer_writes():
+    index = SearchIndex(search_tokenize)
+
+    async def run():
+        batch = asyncio.create_task(index.add_many([("a", {"title": "stale"}), ("b", {"title": "stale"})]))
+        await asyncio.sleep(0)
+        # both land while the batch is still tokenizing in its thread
+        index.add("a", {"title": "fresh"})
+        index.remove("b")
+        await batch
+
+    asyncio.run(run())
+    assert [doc_id for doc_id, _ in index.search("fresh")[1]] == ["a"]
+    assert index.search("stale") == (0, [])
+
+
+def test_rebuild_yields_to_an_index_installed_meanwhile():
+    from mongomock_motor import AsyncMongoMockClient
+
+    db = AsyncMongoMockClient()["search_index_test"]
+    scanning = threading.Event()
+    installed = threading.Event()
+
+    def tokenizer(text):
+        if "stale" in text:
+            # holds the rebuild mid-scan until the swapped-in index is installed
+            scanning.set()
+            installed.wait(5)
+        return search_tokenize(text)
+
+    index = SearchIndex(tokenizer)
+
+    async def run():
+        await db.documents.insert_one({"_id": "old", "title": "stale corpus"})
+        await db.shadow.insert_one({"_id": "new", "title": "fresh corpus"})
+        fresh = await index.build(db.shadow)
+        rebuild = asyncio.create_task(index.rebuild(db.documents))
+        await asyncio.to_thread(scanning.wait, 5)
+        index.install(fresh)
+        installed.set()
+        await rebuild
+
+    asyncio.run(run())
+    assert index.ready
+    assert [doc_id for doc_id, _ in index.search("corpus")[1]] == ["new"]
@@ -0,0 +1,50 @@
+import numpy as np
+
+from vector_index import VectorIndex, normalize, write_index
+
+
+def brute_force(vectors, query, k):
+    ids = list(vectors)
+    scores = normalize(np.stack([vectors[doc_id] for doc_id in ids])) @ normalize(query)[0]
+    return [ids[i] for i in np.argsort(-scores)[:k]]
+
+
+def test_delta_grows_in_place_and_matches_brute_force(tmp_path):
+    rng = np.random.default_rng(0)
+    index = VectorIndex(str(tmp_path))
+    vectors = {}
+    for batch in range(20):
+        ids = [f"d{batch * 64 + i}" for i in range(64)]
+        block = rng.standard_normal((64, 16)).astype(np.float32)
+        index.add(ids, block)
+        vectors.update(zip(ids, block))
+    # doubling leaves room, a full buffer is only ever copied into a twice larger one
+    assert len(index._extra_buffer) == 2048
+    for doc_id in ("d0", "d700", "d1279"):
+        index.remove(doc_id)
+        del vectors[doc_id]
+    replaced = rng.standard_normal((1, 16)).astype(np.float32)
+    index.add(["d5"], replaced)
+    vectors["d5"] = replaced[0]
+
+    assert len(index) == index.unindexed == len(vectors)
+    assert np.allclose(index.vector("d5"), normalize(replaced)[0])
+    assert index.vector("d0") is None
+    query = rng.standard_normal(16).astype(np.float32)
+    assert [doc_id for doc_id, _ in index.search(query, 10)] == brute_force(vectors, query, 10)
+
+
+def test_load_keeps_documents_the_build_did_not_cover(tmp_path):
+    rng = np.random.default_rng(1)
+    built = {f"b{i}": v for i, v in enumerate(rng.standard_normal((50, 8)).astype(np.float32))}
+    index = VectorIndex(str(tmp_path))
+    index.add(["b1", "x1", "x2"], rng.standard_normal((3, 8)))
+    write_index(str(tmp_path), list(built), normalize(np.stack(list(built.values()))))
+    index.load()
+
+    assert index.unindexed == 2
+    assert sorted(index._extra_positions) == ["x1", "x2"]
+    index.add(["x3"], rng.standard_normal((1, 8)))
+    assert index.unindexed == 3
+    assert len(index) == 53
+    assert index.search(index.vector("x3"), 1)[0][0] == "x3"
@@ -0,0 +1,58 @@
+import asyncio
+import time
+from collections import defaultdict
+
+
+class TopicMatcher:
+    def __init__(self, max_age_seconds=60):
+        self.max_age_seconds = max_age_seconds
+        self.topics = {}
+        self.keyword_index = {}
+        self.loaded_at = None
+        self._refresh_lock = asyncio.Lock()
+
+    def load(self, topics):
+        keyword_index = defaultdict(list)
+        by_id = {}
+        for topic in topics:
+            topic_id = topic["topic_id"]
+            by_id[topic_id] = topic
+            for keyword in {kw.lower() for kw in topic.get("keywords", [])}:
+                keyword_index[keyword].append(topic_id)
+
+        self.topics = by_id
+        self.keyword_index = dict(keyword_index)
+        self.loaded_at = time.monotonic()
+
+    async def refresh(self, collection):
+        async with self._refresh_lock:
+            topics = await collection.find(
+                {}, {"_id": 0, "topic_id": 1, "name": 1, "keywords": 1}
+            ).to_list(length=None)
+            self.load(topics)
+        return self
+
+    async def ensure_fresh(self, collection):
+        # picks up topic changes made outside this process
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > self.max_age_seconds:
+            await self.refresh(collection)
+        return self
+
+    def invalidate(self):
+        self.loaded_at = None
+
+    def scores(self, keywords):
+        scores = {}
+        for keyword in {kw.lower() for kw in keywords}:
+            for topic_id in self.keyword_index.get(keyword, ()):
+                scores[topic_id] = scores.get(topic_id, 0) + 1
+        return scores
+
+    def match(self, keywords, limit=3):
+        scores = self.scores(keywords)
+        ranked = sorted(scores, key=lambda topic_id: (-scores[topic_id], topic_id))
+        return ranked[:limit]
+
+    def keywords_for(self, topic_id):
+        topic = self.topics.get(topic_id)
+        return topic.get("keywords", []) if topic else []
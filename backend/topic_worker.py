@@ -0,0 +1,197 @@
+import os
+
+import numpy as np
+
+from ingest import read_csv_column
+from embedding_cache import EmbeddingStore
+from model_store import DEFAULT_EMBEDDING_MODEL, ModelStore
+from vector_index import normalize, write_index
+from metrics import stage
+
+
+_encoders = {}
+
+
+def describe_topics(topic_model):
+    topic_info = topic_model.get_topic_info()
+
+    topic_docs = []
+    topic_names = {}
+    for idx, row in topic_info.iterrows():
+        if row['Topic'] == -1:
+            continue
+
+        topic_keywords = topic_model.get_topic(row['Topic'])
+        keywords = [word for word, score in topic_keywords[:10]] if topic_keywords else []
+        topic_names[int(row['Topic'])] = keywords[:3]
+
+        topic_docs.append({
+            "topic_id": int(row['Topic']),
+            "name": row['Name'] if 'Name' in row else f"Topic {row['Topic']}",
+            "keywords": keywords,
+            "count": int(row['Count']),
+            "representative_docs": []
+        })
+    return topic_docs, topic_names
+
+
+def get_encoder(embedding_model):
+    # loaded once per process, on the first cache miss
+    if embedding_model not in _encoders:
+        from sentence_transformers import SentenceTransformer
+        _encoders[embedding_model] = SentenceTransformer(embedding_model)
+    return _encoders[embedding_model]
+
+
+def embed_texts(texts, embedding_model, cache_dir=None, cache_capacity=1_000_000):
+    def encode(batch):
+        return get_encoder(embedding_model).encode(batch)
+
+    if cache_dir is None:
+        return encode(texts)
+    cache = EmbeddingStore(cache_dir, embedding_model, capacity=cache_capacity)
+    embeddings = cache.embed(texts, encode)
+    print(f"Embeddings: {cache.hits} cached, {cache.misses} computed")
+    return embeddings
+
+
+def fit_topics_from_csv(
+    csv_path,
+    chunk_size=10000,
+    model_dir=None,
+    embedding_model=DEFAULT_EMBEDDING_MODEL,
+    cache_dir=None,
+    cache_capacity=1_000_000,
+):
+    from bertopic import BERTopic
+
+    timings = {}
+    with stage(timings, "read_csv"):
+        stories = read_csv_column(csv_path, 'story', chunk_size)
+    with stage(timings, "embed"):
+        embeddings = embed_texts(stories, embedding_model, cache_dir, cache_capacity)
+
+    topic_model = BERTopic(
+        embedding_model=embedding_model,
+        verbose=True,
+        calculate_probabilities=True
+    )
+    with stage(timings, "fit_transform"):
+        topics, probs = topic_model.fit_transform(stories, embeddings=embeddings)
+
+    topic_docs, topic_names = describe_topics(topic_model)
+
+    with stage(timings, "save_model"):
+        model_version = ModelStore(model_dir, embedding_model).save(topic_model, publish=False) if model_dir else None
+
+    return {
+        "topics": [int(topic_id) for topic_id in topics],
+        "topic_docs": topic_docs,
+        "topic_names": topic_names,
+        "model_version": model_version,
+        "timings": timings,
+    }
+
+
+def merge_topic_model(
+    model_dir,
+    embedding_model,
+    base_version,
+    texts,
+    min_similarity=0.7,
+    cache_dir=None,
+    cache_capacity=1_000_000,
+):
+    from bertopic import BERTopic
+
+    timings = {}
+    store = ModelStore(model_dir, embedding_model)
+    with stage(timings, "load_model"):
+        base_model, base_version = store.load(base_version)
+    if base_model is None:
+        raise RuntimeError("No saved topic model to merge into")
+
+    # BERTopic.partial_fit needs online sub-models chosen at fit time, so new
+    # documents get their own small model that is merged into the base one;
+    # topics closer than min_similarity to an existing topic are folded into it
+    with stage(timings, "embed"):
+        embeddings = embed_texts(texts, embedding_model, cache_dir, cache_capacity)
+    new_model = BERTopic(embedding_model=embedding_model, verbose=True)
+    with stage(timings, "fit"):
+        new_model.fit(texts, embeddings=embeddings)
+    with stage(timings, "merge"):
+        merged_model = BERTopic.merge_models(
+            [base_model, new_model],
+            min_similarity=min_similarity,
+            embedding_model=embedding_model
+        )
+
+    with stage(timings, "transform"):
+        topics, _ = merged_model.transform(texts, embeddings=embeddings)
+    topic_docs, topic_names = describe_topics(merged_model)
+    with stage(timings, "save_model"):
+        model_version = store.save(merged_model, extra_meta={"merged_from": base_version}, publish=False)
+
+    return {
+        "topics": [int(topic_id) for topic_id in topics],
+        "topic_docs": topic_docs,
+        "topic_names": topic_names,
+        "model_version": model_version,
+        "timings": timings,
+    }
+
+
+def build_vector_index(
+    mongodb_url,
+    database_name,
+    index_dir,
+    embedding_model=DEFAULT_EMBEDDING_MODEL,
+    cache_dir=None,
+    cache_capacity=1_000_000,
+    batch_size=1024,
+    nlist=None,
+):
+    from pymongo import MongoClient
+
+    # reads Mongo directly so the corpus never has to be pickled into the pool;
+    # content is what topic fitting embeds, so most of it is already cached
+    os.makedirs(index_dir, exist_ok=True)
+    raw_path = os.path.join(index_dir, f"building-{os.getpid()}.f32")
+    client = MongoClient(mongodb_url)
+    doc_ids = []
+    dim = None
+    timings = {}
+    try:
+        with stage(timings, "embed"), open(raw_path, "wb") as raw:
+            batch = []
+            cursor = client[database_name].documents.find({}, {"content": 1}, batch_size=batch_size)
+            for doc in cursor:
+                batch.append(doc)
+                if len(batch) == batch_size:
+                    dim = _write_embeddings(raw, batch, doc_ids, embedding_model, cache_dir, cache_capacity)
+                    batch = []
+            if batch:
+                dim = _write_embeddings(raw, batch, doc_ids, embedding_model, cache_dir, cache_capacity)
+
+        if not doc_ids:
+            return {"version": None, "documents": 0, "timings": timings}
+        vectors = np.memmap(raw_path, dtype=np.float32, mode="r", shape=(len(doc_ids), dim))
+        with stage(timings, "write_index"):
+            version = write_index(index_dir, doc_ids, vectors, nlist, extra_meta={"embedding_model": embedding_model})
+        del vectors
+    finally:
+        client.close()
+        if os.path.exists(raw_path):
+            os.remove(raw_path)
+
+    print(f"Vector index {version}: {len(doc_ids)} documents")
+    return {"version": version, "documents": len(doc_ids), "timings": timings}
+
+
+def _write_embeddings(raw, batch, doc_ids, embedding_model, cache_dir, cache_capacity):
+    embeddings = normalize(embed_texts(
+        [doc.get("content") or "" for doc in batch], embedding_model, cache_dir, cache_capacity
+    ))
+    raw.write(embeddings.tobytes())
+    doc_ids.extend(str(doc["_id"]) for doc in batch)
+    return embeddings.shape[1]
@@ -0,0 +1,289 @@
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+
+LATEST_FILE = "LATEST"
+META_FILE = "meta.json"
+VECTORS_FILE = "vectors.f32"
+IDS_FILE = "ids.bin"
+CENTROIDS_FILE = "centroids.npy"
+OFFSETS_FILE = "offsets.npy"
+ID_DTYPE = "S24"
+
+
+def normalize(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(scores, k):
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    # argpartition finds the k best in O(n), only those k get sorted
+    idx = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+def default_nlist(count):
+    # brute force stays under ~10 ms up to ~50k vectors of 384 dims
+    return int(4 * np.sqrt(count)) if count >= 50_000 else 0
+
+
+def train_ivf(vectors, nlist, iterations=10, sample_size=None, seed=0):
+    # spherical k-means on a sample, vectors are unit length so dot product is cosine
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), sample_size or nlist * 64)
+    sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))])
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+    for _ in range(iterations):
+        labels = np.argmax(sample @ centroids.T, axis=1)
+        order = np.argsort(labels, kind="stable")
+        clusters, starts = np.unique(labels[order], return_index=True)
+        sums = centroids.copy()
+        sums[clusters] = np.add.reduceat(sample[order], starts, axis=0)
+        centroids = normalize(sums)
+    return centroids
+
+
+def assign_lists(vectors, centroids, chunk_size=65536):
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), chunk_size):
+        labels[start:start + chunk_size] = np.argmax(
+            np.asarray(vectors[start:start + chunk_size]) @ centroids.T, axis=1
+        )
+    return labels
+
+
+def write_index(root, doc_ids, vectors, nlist=None, keep_versions=2, extra_meta=None, chunk_size=65536):
+    os.makedirs(root, exist_ok=True)
+    version = time.strftime("%Y%m%d-%H%M%S") + f"-{int(time.time() * 1000) % 1000:03d}"
+    path = os.path.join(root, version)
+    os.makedirs(path)
+
+    count, dim = vectors.shape
+    nlist = default_nlist(count) if nlist is None else nlist
+    if nlist > 1 and count >= nlist * 8:
+        centroids = train_ivf(vectors, nlist)
+        labels = assign_lists(vectors, centroids, chunk_size)
+        # rows are stored grouped by list, so probing a list reads one contiguous slice
+        order = np.argsort(labels, kind="stable")
+        offsets = np.searchsorted(labels[order], np.arange(nlist + 1)).astype(np.int64)
+        np.save(os.path.join(path, CENTROIDS_FILE), centroids)
+        np.save(os.path.join(path, OFFSETS_FILE), offsets)
+    else:
+        nlist = 0
+        order = np.arange(count)
+
+    stored = np.memmap(os.path.join(path, VECTORS_FILE), dtype=np.float32, mode="w+", shape=(count, dim))
+    for start in range(0, count, chunk_size):
+        stored[start:start + chunk_size] = vectors[order[start:start + chunk_size]]
+    stored.flush()
+    del stored
+    ids = np.asarray(doc_ids, dtype=ID_DTYPE)[order]
+    ids.tofile(os.path.join(path, IDS_FILE))
+
+    with open(os.path.join(path, META_FILE), "w") as f:
+        json.dump({"version": version, "count": int(count), "dim": int(dim), "nlist": nlist,
+                   "built_at": time.time(), **(extra_meta or {})}, f)
+
+    tmp = os.path.join(root, LATEST_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(root, LATEST_FILE))
+
+    versions = sorted(name for name in os.listdir(root) if os.path.isdir(os.path.join(root, name)))
+    for old in versions[:-keep_versions]:
+        if old != version:
+            shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+    return version
+
+
+class VectorIndex:
+    def __init__(self, root, nprobe=16):
+        self.root = root
+        self.nprobe = nprobe
+        self.version = None
+        self.dim = None
+        self.vectors = None
+        self.ids = None
+        self.positions = {}
+        self.deleted = None
+        self.centroids = None
+        self.offsets = None
+        # documents embedded after the last build, searched by brute force; rows live
+        # in a buffer that doubles when full so adding a batch doesn't copy the rest
+        self._extra_ids = []
+        self._extra_positions = {}
+        self._extra_buffer = None
+
+    @property
+    def ready(self):
+        return self.vectors is not None or bool(self._extra_ids)
+
+    @property
+    def unindexed(self):
+        return len(self._extra_ids)
+
+    @property
+    def _extra_vectors(self):
+        return self._extra_buffer[:len(self._extra_ids)]
+
+    def __len__(self):
+        main = len(self.positions) - int(self.deleted.sum()) if self.deleted is not None else 0
+        return main + len(self._extra_ids)
+
+    def latest_version(self):
+        try:
+            with open(os.path.join(self.root, LATEST_FILE)) as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return version if version and os.path.isdir(os.path.join(self.root, version)) else None
+
+    def load(self, version=None):
+        version = version or self.latest_version()
+        if version is None:
+            return None
+        path = os.path.join(self.root, version)
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+
+        count, dim = meta["count"], meta["dim"]
+        vectors = np.memmap(os.path.join(path, VECTORS_FILE), dtype=np.float32, mode="r", shape=(count, dim))
+        ids = np.fromfile(os.path.join(path, IDS_FILE), dtype=ID_DTYPE)
+        positions = dict(zip(ids.astype(str).tolist(), range(count)))
+        centroids = offsets = None
+        if meta.get("nlist"):
+            centroids = np.load(os.path.join(path, CENTROIDS_FILE))
+            offsets = np.load(os.path.join(path, OFFSETS_FILE))
+
+        # documents added since the build started are kept unless the build covered them
+        keep = [doc_id for doc_id in self._extra_ids if doc_id not in positions]
+        extra = self._extra_vectors[[self._extra_positions[doc_id] for doc_id in keep]] if keep else None
+
+        self.version, self.dim = version, dim
+        self.vectors, self.ids, self.positions = vectors, ids, positions
+        self.deleted = np.zeros(count, dtype=bool)
+        self.centroids, self.offsets = centroids, offsets
+        self._extra_ids = keep
+        self._extra_positions = {doc_id: i for i, doc_id in enumerate(keep)}
+        self._extra_buffer = extra
+        return meta
+
+    def add(self, doc_ids, vectors):
+        vectors = normalize(vectors)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        new_ids, new_rows = [], []
+        for doc_id, vector in zip(doc_ids, vectors):
+            row = self.positions.get(doc_id)
+            if row is not None:
+                self.deleted[row] = True
+            extra_row = self._extra_positions.get(doc_id)
+            if extra_row is not None:
+                self._extra_buffer[extra_row] = vector
+            else:
+                self._extra_positions[doc_id] = len(self._extra_ids) + len(new_ids)
+                new_ids.append(doc_id)
+                new_rows.append(vector)
+        if new_ids:
+            count = len(self._extra_ids)
+            needed = count + len(new_ids)
+            capacity = 0 if self._extra_buffer is None else len(self._extra_buffer)
+            if needed > capacity:
+                buffer = np.empty((max(needed, capacity * 2, 64), vectors.shape[1]), dtype=np.float32)
+                if count:
+                    buffer[:count] = self._extra_vectors
+                self._extra_buffer = buffer
+            self._extra_buffer[count:needed] = new_rows
+            self._extra_ids.extend(new_ids)
+
+    def remove(self, doc_id):
+        row = self.positions.get(doc_id)
+        if row is not None:
+            self.deleted[row] = True
+        extra_row = self._extra_positions.pop(doc_id, None)
+        if extra_row is not None:
+            # swap the last row into the hole
+            last = len(self._extra_ids) - 1
+            if extra_row != last:
+                moved = self._extra_ids[last]
+                self._extra_ids[extra_row] = moved
+                self._extra_buffer[extra_row] = self._extra_buffer[last]
+                self._extra_positions[moved] = extra_row
+            self._extra_ids.pop()
+
+    def vector(self, doc_id):
+        extra_row = self._extra_positions.get(doc_id)
+        if extra_row is not None:
+            return np.array(self._extra_buffer[extra_row])
+        row = self.positions.get(doc_id)
+        if row is not None and not self.deleted[row]:
+            return np.array(self.vectors[row])
+        return None
+
+    def _candidate_rows(self, query):
+        if self.centroids is None:
+            return None
+        lists = top_k(self.centroids @ query, self.nprobe)
+        return [(int(self.offsets[c]), int(self.offsets[c + 1])) for c in sorted(lists.tolist())]
+
+    def _search_main(self, query, k):
+        if self.vectors is None or not len(self.vectors):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        ranges = self._candidate_rows(query)
+        if ranges is None:
+            rows = None
+            scores = self.vectors @ query
+        else:
+            rows = np.concatenate([np.arange(start, end) for start, end in ranges])
+            scores = np.concatenate([self.vectors[start:end] @ query for start, end in ranges])
+        deleted = self.deleted if rows is None else self.deleted[rows]
+        scores[deleted] = -np.inf
+        best = top_k(scores, k)
+        best = best[np.isfinite(scores[best])]
+        return (best if rows is None else rows[best]), scores[best]
+
+    def search(self, query, k=10, exclude=()):
+        return self.search_many(normalize(query), k, exclude)[0]
+
+    def search_many(self, queries, k=10, exclude=()):
+        queries = normalize(queries)
+        exclude = set(exclude)
+        wanted = k + len(exclude)
+
+        extra_scores = None
+        if self._extra_ids:
+            # one matrix product scores every query against the unindexed documents
+            extra_scores = queries @ self._extra_vectors.T
+
+        results = []
+        for i, query in enumerate(queries):
+            rows, scores = self._search_main(query, wanted)
+            hits = [(self.ids[row].decode("ascii"), float(score)) for row, score in zip(rows.tolist(), scores.tolist())]
+            if extra_scores is not None:
+                best = top_k(extra_scores[i], wanted)
+                hits.extend((self._extra_ids[j], float(extra_scores[i][j])) for j in best.tolist())
+                hits.sort(key=lambda hit: -hit[1])
+            results.append([hit for hit in hits if hit[0] not in exclude][:k])
+        return results
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "documents": len(self),
+            "indexed": len(self.positions),
+            "unindexed": len(self._extra_ids),
+            "dim": self.dim,
+            "nlist": 0 if self.centroids is None else len(self.centroids),
+            "nprobe": self.nprobe,
+        }
@@ -0,0 +1,145 @@
+import asyncio
+import os
+import socket
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+
+WORKER_EVENTS_COLLECTION = "worker_events"
+WORKER_LOCKS_COLLECTION = "worker_locks"
+# a bulk write can touch more ids than fit in one 16 MB event document
+MAX_IDS_PER_EVENT = 10000
+
+
+class WorkerSync:
+    def __init__(self, poll_interval_seconds=1.0, settle_seconds=2.0, retention_seconds=3600):
+        self.poll_interval_seconds = poll_interval_seconds
+        # ObjectIds from different processes aren't ordered within a second, only
+        # events old enough that every earlier insert has landed are consumed
+        self.settle_seconds = settle_seconds
+        self.retention_seconds = retention_seconds
+        self.worker_id = None
+        self.published = 0
+        self.applied = 0
+        self.failed = 0
+        self._collection = None
+        self._locks = None
+        self._cursor = None
+        self._task = None
+
+    @property
+    def enabled(self):
+        return self._collection is not None
+
+    async def publish(self, event, doc_ids, topic_ids):
+        if self._collection is None:
+            return
+        now = datetime.utcnow()
+        chunks = [doc_ids[i:i + MAX_IDS_PER_EVENT] for i in range(0, len(doc_ids), MAX_IDS_PER_EVENT)] or [[]]
+        await self._collection.insert_many([
+            {
+                "worker": self.worker_id,
+                "event": event,
+                "doc_ids": chunk,
+                "topic_ids": sorted(topic_ids),
+                "created_at": now,
+            }
+            for chunk in chunks
+        ], ordered=True)
+        self.published += len(chunks)
+
+    async def acquire(self, name, lease_seconds):
+        if self._locks is None:
+            return True
+        now = datetime.utcnow()
+        try:
+            # the upsert collides with a live lease held by another worker; an expired one is taken over
+            await self._locks.find_one_and_update(
+                {"_id": name, "$or": [{"expires_at": {"$lt": now}}, {"holder": self.worker_id}]},
+                {"$set": {"holder": self.worker_id, "expires_at": now + timedelta(seconds=lease_seconds)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def release(self, name):
+        if self._locks is not None:
+            await self._locks.delete_one({"_id": name, "holder": self.worker_id})
+
+    @asynccontextmanager
+    async def lease(self, name, lease_seconds):
+        acquired = await self.acquire(name, lease_seconds)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                await self.release(name)
+
+    async def start(self, db, apply):
+        # runs after the fork, so the id is this worker's, not the preloading master's
+        if self.worker_id is None:
+            self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        collection = db[WORKER_EVENTS_COLLECTION]
+        await collection.create_index([("created_at", ASCENDING)], expireAfterSeconds=int(self.retention_seconds))
+        # events from before this worker started are already reflected in what it loads
+        self._cursor = self._settled()
+        self._collection = collection
+        self._locks = db[WORKER_LOCKS_COLLECTION]
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(apply))
+
+    async def stop(self):
+        self._collection = None
+        self._locks = None
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _settled(self):
+        # the smallest ObjectId of the second that is settle_seconds old
+        return ObjectId.from_datetime(datetime.utcnow() - timedelta(seconds=self.settle_seconds))
+
+    async def poll(self, apply):
+        settled = self._settled()
+        if settled <= self._cursor:
+            return 0
+        # each poll consumes [cursor, settled), so consecutive windows neither overlap nor leave gaps
+        events = await self._collection.find({
+            "_id": {"$gte": self._cursor, "$lt": settled},
+            "worker": {"$ne": self.worker_id},
+        }).sort("_id", ASCENDING).to_list(length=None)
+        for event in events:
+            try:
+                await apply(event["event"], event["doc_ids"], set(event["topic_ids"]))
+                self.applied += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"Error applying {event['event']} from worker {event['worker']}: {str(e)}")
+        self._cursor = settled
+        return len(events)
+
+    async def _run(self, apply):
+        # other workers' writes and reloads, applied to this worker's in-memory state
+        while True:
+            await asyncio.sleep(self.poll_interval_seconds)
+            try:
+                await self.poll(apply)
+            except Exception as e:
+                print(f"Error polling worker events: {str(e)}")
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "worker_id": self.worker_id,
+            "published": self.published,
+            "applied": self.applied,
+            "failed": self.failed,
+            "poll_interval_seconds": self.poll_interval_seconds,
+        }
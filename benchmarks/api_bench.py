@@ -0,0 +1,226 @@
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from synthetic_corpus import write_corpus
+
+
+def percentiles(samples):
+    if not samples:
+        return {"n": 0}
+    values = np.asarray(samples) * 1000
+    return {
+        "n": len(samples),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+
+def timed(samples, call):
+    started = time.perf_counter()
+    response = call()
+    samples.append(time.perf_counter() - started)
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.request.method} {response.request.url} -> {response.status_code}: {response.text[:300]}")
+    return response
+
+
+def wait_for(predicate, timeout, interval=0.05):
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if predicate():
+            return time.perf_counter() - started
+        time.sleep(interval)
+    raise TimeoutError(f"gave up after {timeout}s")
+
+
+def patch_mongomock():
+    # pymongo 4.9+ passes sort= to bulk update builders, which mongomock does not accept yet
+    import mongomock.collection
+
+    for name in ("add_update", "add_replace", "add_delete"):
+        original = getattr(mongomock.collection.BulkOperationBuilder, name)
+
+        def patched(self, *args, _original=original, **kwargs):
+            kwargs.pop("sort", None)
+            return _original(self, *args, **kwargs)
+        setattr(mongomock.collection.BulkOperationBuilder, name, patched)
+
+
+def load_app(args, work_dir):
+    # the app reads its configuration at import time
+    os.environ["CSV_PATH"] = args.csv
+    os.environ["DATABASE_NAME"] = args.database
+    os.environ["MONGODB_URL"] = args.mongodb_url
+    os.environ.setdefault("MODEL_DIR", os.path.join(work_dir, "models"))
+    os.environ.setdefault("VECTOR_INDEX_DIR", os.path.join(work_dir, "vectors"))
+    os.environ.setdefault("EMBEDDING_CACHE_DIR", os.path.join(work_dir, "embeddings"))
+
+    started = time.perf_counter()
+    import app as app_module
+    import_s = time.perf_counter() - started
+
+    if args.backend == "mongomock":
+        import mongomock_motor
+
+        patch_mongomock()
+        shared = mongomock_motor.AsyncMongoMockClient()
+        # every startup has to see the same in-memory database
+        app_module.AsyncIOMotorClient = lambda *a, **k: shared
+    return app_module, import_s
+
+
+def app_ready(client):
+    return client.get("/health/ready").status_code == 200
+
+
+def search_ready(client):
+    # "total" is only reported once the in-memory BM25 index is built
+    return "total" in client.get("/api/documents/search", params={"q": "benchmark"}).json()
+
+
+def bootstrap_done(client):
+    jobs = [job for job in client.get("/api/jobs").json() if job["kind"] == "bootstrap_topics"]
+    # a job listed before its task first runs is still "queued"
+    return bool(jobs) and jobs[0]["status"] in ("completed", "failed", "cancelled")
+
+
+def sample_stories(csv_path, count):
+    stories = []
+    with open(csv_path, encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            stories.append(row["story"])
+            if len(stories) >= count:
+                break
+    return stories
+
+
+def run(args):
+    from fastapi.testclient import TestClient
+
+    work_dir = tempfile.mkdtemp(prefix="neurodoc-bench-")
+    results = {"config": {k: v for k, v in vars(args).items() if k != "output"}}
+
+    if not args.csv:
+        args.csv = os.path.join(work_dir, "corpus.csv")
+        results["corpus"] = write_corpus(args.csv, args.rows, args.seed)
+
+    app_module, import_s = load_app(args, work_dir)
+    rng = random.Random(args.seed)
+    vocabulary = sorted({word for story in sample_stories(args.csv, 200) for word in story.split()})
+    queries = [" ".join(rng.sample(vocabulary, rng.randint(1, 3))) for _ in range(args.requests)]
+
+    with TestClient(app_module.app) as client:
+        started = time.perf_counter()
+        ingest = client.get("/api/csv/load").json()
+        results["ingest"] = {
+            "seconds": round(time.perf_counter() - started, 3),
+            "rows": ingest.get("documents_loaded"),
+            **ingest.get("ingest", {}),
+        }
+
+    # a fresh start against the loaded corpus is what a deploy pays for
+    started = time.perf_counter()
+    with TestClient(app_module.app) as client:
+        startup_s = time.perf_counter() - started
+        wait_for(lambda: app_ready(client), args.timeout)
+        ready_s = time.perf_counter() - started
+        wait_for(lambda: search_ready(client), args.timeout)
+        search_ready_s = time.perf_counter() - started
+        wait_for(lambda: bootstrap_done(client), args.timeout)
+        bootstrap_s = time.perf_counter() - started
+        results["startup"] = {
+            "import_s": round(import_s, 3),
+            "startup_s": round(startup_s, 3),
+            "ready_s": round(ready_s, 3),
+            "search_ready_s": round(search_ready_s, 3),
+            "bootstrap_s": round(bootstrap_s, 3),
+        }
+
+        params = {"fields": args.fields} if args.fields else {}
+
+        samples = []
+        for q in queries:
+            timed(samples, lambda: client.get("/api/documents/search", params={"q": q, "limit": 20, **params}))
+        results["search"] = percentiles(samples)
+
+        samples = []
+        for _ in range(args.requests):
+            timed(samples, lambda: client.get("/api/documents/search", params={"q": queries[0], "limit": 20, **params}))
+        results["search_repeated"] = percentiles(samples)
+
+        samples = []
+        cursor = None
+        for _ in range(args.requests):
+            page = timed(samples, lambda: client.get(
+                "/api/documents", params={"limit": 50, **params, **({"cursor": cursor} if cursor else {})}
+            )).json()
+            cursor = page.get("next_cursor")
+        results["list"] = percentiles(samples)
+
+        topic_ids = [topic["topic_id"] for topic in client.get("/api/topics").json()]
+        samples = []
+        for i in range(args.requests if topic_ids else 0):
+            topic_id = topic_ids[i % len(topic_ids)]
+            timed(samples, lambda: client.get(f"/api/documents/filter/topic/{topic_id}", params={"limit": 50, **params}))
+        results["filter"] = percentiles(samples)
+
+        stories = sample_stories(args.csv, args.writes)
+        samples = []
+        started = time.perf_counter()
+        for i, story in enumerate(stories):
+            timed(samples, lambda: client.post(
+                "/api/documents", json={"title": f"Benchmark {i}", "content": story, "genre": "benchmark"}
+            ))
+        results["create"] = {**percentiles(samples), "per_second": round(len(samples) / (time.perf_counter() - started), 1)}
+
+        samples = []
+        started = time.perf_counter()
+        for story in stories:
+            timed(samples, lambda: client.post("/api/topics/suggest", json={"content": story}))
+        results["suggest"] = {**percentiles(samples), "per_second": round(len(samples) / (time.perf_counter() - started), 1)}
+
+        if args.backend == "mongod" and not args.keep_database:
+            client.portal.call(app_module.client.drop_database, args.database)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end API benchmark against mongod or mongomock-motor")
+    parser.add_argument("--backend", choices=("mongod", "mongomock"), default="mongomock")
+    parser.add_argument("--mongodb-url", default="mongodb://localhost:27017/")
+    parser.add_argument("--database", default="neurodoc_bench")
+    parser.add_argument("--keep-database", action="store_true")
+    parser.add_argument("--csv", help="existing id,title,story,genre CSV, generated when omitted")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=200, help="requests per read benchmark")
+    parser.add_argument("--writes", type=int, default=100, help="requests per create/suggest benchmark")
+    parser.add_argument("--fields", default="title,genre,topic_names,date_added",
+                        help="projection for reads; mongomock can't evaluate the default snippet view")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+
+    results = run(args)
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
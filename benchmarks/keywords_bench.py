@@ -0,0 +1,110 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import re
+import sys
+import timeit
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from keywords import STOP_WORDS, extract_keywords, extract_keywords_batch, preprocess
+
+
+def baseline_extract_keywords(text, num_keywords=5):
+    # extract_keywords as it was before the keywords module
+    text = re.sub(r'[^a-zA-Z\s]', '', text.lower())
+
+    stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+                  'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were', 'be',
+                  'been', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would',
+                  'should', 'could', 'may', 'might', 'can', 'this', 'that', 'these',
+                  'those', 'it', 'its', 'they', 'them', 'their', 'he', 'she', 'him',
+                  'her', 'his', 'i', 'you', 'we', 'us', 'my', 'your', 'our'}
+
+    words = [word for word in text.split() if word not in stop_words and len(word) > 3]
+    word_freq = Counter(words)
+
+    return [word for word, _ in word_freq.most_common(num_keywords)]
+
+
+def countvectorizer_keywords(texts, num_keywords=5):
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    vectorizer = CountVectorizer(
+        preprocessor=preprocess,
+        token_pattern=r'[a-z]{4,}',
+        stop_words=[w for w in STOP_WORDS if len(w) >= 4],
+    )
+    counts = vectorizer.fit_transform(texts)
+    vocabulary = vectorizer.get_feature_names_out()
+    keywords = []
+    for row in range(counts.shape[0]):
+        start, end = counts.indptr[row], counts.indptr[row + 1]
+        top = sorted(zip(-counts.data[start:end], counts.indices[start:end]))[:num_keywords]
+        keywords.append([vocabulary[i] for _, i in top])
+    return keywords
+
+
+def synthetic_texts(count, words_per_text, seed=0):
+    # Zipf-distributed words with the common English stop words at the head,
+    # some capitalisation and punctuation, roughly like story text
+    rng = random.Random(seed)
+    head = ['the', 'and', 'of', 'to', 'a', 'in', 'was', 'he', 'she', 'it',
+            'his', 'her', 'that', 'with', 'for', 'they', 'had', 'on', 'at', 'as']
+    vocabulary = head + [
+        ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(3, 10)))
+        for _ in range(20000)
+    ]
+    weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(vocabulary))))
+    texts = []
+    for _ in range(count):
+        words = rng.choices(vocabulary, cum_weights=weights, k=words_per_text)
+        texts.append(' '.join(
+            word.capitalize() if i % 12 == 0 else (word + ',' if i % 15 == 14 else word)
+            for i, word in enumerate(words)
+        ) + '.')
+    return texts
+
+
+def best_of(fn, repeat):
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keyword extraction microbenchmark")
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--words", type=int, default=300)
+    parser.add_argument("--keywords", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    texts = synthetic_texts(args.docs, args.words)
+    n = args.keywords
+
+    expected = [baseline_extract_keywords(t, n) for t in texts]
+    assert [extract_keywords(t, n) for t in texts] == expected
+    assert extract_keywords_batch(texts, n) == expected
+
+    results = {
+        "docs": args.docs,
+        "words_per_doc": args.words,
+        "baseline_s": best_of(lambda: [baseline_extract_keywords(t, n) for t in texts], args.repeat),
+        "extract_keywords_s": best_of(lambda: [extract_keywords(t, n) for t in texts], args.repeat),
+        "extract_keywords_batch_s": best_of(lambda: extract_keywords_batch(texts, n), args.repeat),
+    }
+    try:
+        results["countvectorizer_s"] = best_of(lambda: countvectorizer_keywords(texts, n), args.repeat)
+    except ImportError:
+        pass
+
+    for key in list(results):
+        if key.endswith("_s") and key != "baseline_s":
+            results[f"speedup_{key[:-2]}"] = round(results["baseline_s"] / results[key], 2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
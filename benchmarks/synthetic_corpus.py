@@ -0,0 +1,71 @@
+import argparse
+import csv
+import json
+import time
+
+import numpy as np
+
+
+GENRES = (
+    "fantasy", "adventure", "horror", "mystery", "romance", "science fiction", "thriller", "western",
+    "historical", "comedy", "drama", "fairy tale", "crime", "dystopian", "mythology", "war",
+    "sports", "satire", "gothic", "cyberpunk",
+)
+SYLLABLES = (
+    "ka", "lo", "mi", "ra", "ven", "dor", "th", "el", "an", "is", "or", "ur", "sha", "bel", "qui",
+    "tor", "nim", "gal", "fen", "rin", "sol", "mar", "wyn", "del", "cor", "ash", "eth", "ul", "ber", "zan",
+)
+
+
+def make_vocabulary(size, rng):
+    # pronounceable made-up words, long enough to survive the keyword extractor's minimum length
+    words = set()
+    while len(words) < size:
+        count = rng.integers(2, 5)
+        words.add("".join(SYLLABLES[i] for i in rng.integers(0, len(SYLLABLES), count)))
+    # sorted first so the seed alone decides which words end up common
+    return rng.permutation(np.array(sorted(words)))
+
+
+def zipf_words(rng, vocabulary, count, exponent):
+    # word frequencies follow a Zipf law, like real text, so BM25 document frequencies are realistic
+    ranks = rng.zipf(exponent, count)
+    return vocabulary[np.minimum(ranks, len(vocabulary)) - 1]
+
+
+def iter_rows(rows, vocabulary_size=20000, min_words=60, max_words=220, exponent=1.15, seed=0):
+    rng = np.random.default_rng(seed)
+    vocabulary = make_vocabulary(vocabulary_size, rng)
+    # each genre favours its own slice of the vocabulary, which gives topic models something to find
+    genre_words = [vocabulary[rng.integers(0, vocabulary_size, 40)] for _ in GENRES]
+    for story_id in range(1, rows + 1):
+        genre = int(rng.integers(0, len(GENRES)))
+        length = int(rng.integers(min_words, max_words))
+        words = zipf_words(rng, vocabulary, length, exponent)
+        flavour = genre_words[genre][rng.integers(0, 40, max(1, length // 8))]
+        story = " ".join(np.concatenate([words, flavour])[rng.permutation(len(words) + len(flavour))])
+        title = " ".join(genre_words[genre][rng.integers(0, 40, 3)]).title()
+        yield story_id, title, story, GENRES[genre]
+
+
+def write_corpus(path, rows, seed=0, **kwargs):
+    started = time.perf_counter()
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(("id", "title", "story", "genre"))
+        writer.writerows(iter_rows(rows, seed=seed, **kwargs))
+    return {"path": path, "rows": rows, "seconds": round(time.perf_counter() - started, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic id,title,story,genre corpus for load_csv_data")
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(write_corpus(args.path, args.rows, args.seed, vocabulary_size=args.vocabulary)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from vector_index import VectorIndex, normalize, top_k, write_index
+
+
+def synthetic_vectors(count, dim, clusters, seed=0):
+    # unit vectors around random centres, a rough stand-in for sentence embeddings
+    rng = np.random.default_rng(seed)
+    centres = normalize(rng.standard_normal((clusters, dim)))
+    labels = rng.integers(0, clusters, count)
+    vectors = np.empty((count, dim), dtype=np.float32)
+    for start in range(0, count, 65536):
+        end = min(count, start + 65536)
+        noise = rng.standard_normal((end - start, dim)).astype(np.float32) * 0.35
+        vectors[start:end] = normalize(centres[labels[start:end]] + noise / np.sqrt(dim) * 4)
+    return vectors
+
+
+def percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector index search latency and recall")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=-1, help="-1 picks 4*sqrt(rows), 0 is brute force")
+    parser.add_argument("--nprobe", type=int, default=16)
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.rows, args.dim, args.clusters)
+    doc_ids = [f"{i:024x}" for i in range(args.rows)]
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.integers(0, args.rows, args.queries)] + rng.standard_normal((args.queries, args.dim)).astype(np.float32) * 0.01
+
+    with tempfile.TemporaryDirectory() as root:
+        started = time.perf_counter()
+        write_index(root, doc_ids, vectors, None if args.nlist < 0 else args.nlist)
+        build_s = time.perf_counter() - started
+
+        index = VectorIndex(root, nprobe=args.nprobe)
+        started = time.perf_counter()
+        meta = index.load()
+        load_s = time.perf_counter() - started
+
+        latencies = []
+        recalls = []
+        for query in queries:
+            started = time.perf_counter()
+            hits = index.search(query, args.k)
+            latencies.append(time.perf_counter() - started)
+
+            exact = {doc_ids[i] for i in top_k(vectors @ normalize(query)[0], args.k).tolist()}
+            recalls.append(len(exact & {doc_id for doc_id, _ in hits}) / args.k)
+
+    print(json.dumps({
+        "rows": args.rows,
+        "dim": args.dim,
+        "nlist": meta["nlist"],
+        "nprobe": args.nprobe,
+        "build_s": round(build_s, 2),
+        "load_s": round(load_s, 3),
+        "p50_ms": percentile_ms(latencies, 50),
+        "p99_ms": percentile_ms(latencies, 99),
+        "recall_at_k": round(float(np.mean(recalls)), 4),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
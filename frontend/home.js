@@ -78,7 +78,8 @@ function renderDocuments(docs) {
     grid.innerHTML = docs.map(doc => {
         const docId = doc._id || doc.id;
         const tags = doc.topic_names || doc.tags || [];
-        const preview = doc.content ? doc.content.substring(0, 200) + '...' : (doc.preview || '');
+        const text = doc.snippet || doc.content;
+        const preview = text ? text.substring(0, 200) + '...' : (doc.preview || '');
         
         return `
             <div class="document-card" onclick="viewDocument('${docId}')">
@@ -141,7 +142,7 @@ function setupSearch() {
                     filteredDocuments = baseDocuments.filter(doc => {
                         const queryLower = query.toLowerCase();
                         return doc.title.toLowerCase().includes(queryLower) ||
-                               (doc.content && doc.content.toLowerCase().includes(queryLower)) ||
+                               ((doc.content || doc.snippet || '').toLowerCase().includes(queryLower)) ||
                                (doc.genre && doc.genre.toLowerCase().includes(queryLower));
                     });
                 }
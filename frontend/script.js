@@ -131,10 +131,18 @@ async function apiRequest(endpoint, options = {}) {
     }
 }
 
-async function loadDocuments() {
+async function loadDocuments(maxDocuments = 1000, pageSize = 200) {
     try {
-        const response = await apiRequest('/api/documents?limit=1000');
-        documentsCache = response.documents || [];
+        const loaded = [];
+        let cursor = null;
+        do {
+            const params = new URLSearchParams({ limit: pageSize });
+            if (cursor) params.set('cursor', cursor);
+            const response = await apiRequest(`/api/documents?${params}`);
+            loaded.push(...(response.documents || []));
+            cursor = response.next_cursor;
+        } while (cursor && loaded.length < maxDocuments);
+        documentsCache = loaded.slice(0, maxDocuments);
         return documentsCache;
     } catch (error) {
         console.error('Error loading documents:', error);
@@ -219,11 +227,25 @@ async function filterDocumentsByTopic(topicId) {
     }
 }
 
+async function waitForJob(jobId, intervalMs = 2000) {
+    while (true) {
+        const job = await apiRequest(`/api/jobs/${jobId}`);
+        if (job.status === 'completed') {
+            return job.result;
+        }
+        if (job.status === 'failed' || job.status === 'cancelled') {
+            throw new Error(job.error || `Job ${job.status}`);
+        }
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+    }
+}
+
 async function generateTopics() {
     try {
-        return await apiRequest('/api/topics/generate', {
+        const job = await apiRequest('/api/topics/generate', {
             method: 'POST'
         });
+        return await waitForJob(job.job_id);
     } catch (error) {
         console.error('Error generating topics:', error);
         throw error;